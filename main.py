@@ -1,36 +1,57 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
+import itertools
 import logging
-import os
-from typing import List
 
 from tgparser.config import load_config
 from tgparser.logging_setup import setup_logging
 from tgparser.parser import Parser
+from tgparser.queries import iter_queries
+from tgparser.service import SearchService
+from tgparser.sharding import run_sharded
 
 
-def read_queries(path: str) -> List[str]:
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip()]
+def parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Telegram channels/chats search parser")
+    ap.add_argument("--resume", action="store_true", help="continue an interrupted run from the progress journal")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help="split queries and accounts over N processes (default: 1)")
+    ap.add_argument("--serve", nargs="?", const="", default=None, metavar="ADDR",
+                    help="run as a service with connected clients, taking jobs on a Unix socket path "
+                         "or host:port (default: SERVICE_ADDRESS)")
+    return ap.parse_args()
 
 
 def main() -> None:
+    args = parse_args()
     cfg = load_config()
     setup_logging(cfg)
 
     logger = logging.getLogger("main")
 
-    queries = read_queries(cfg.queries_file)
-    if not queries:
+    if args.serve is not None:
+        logger.info("Starting service...")
+        SearchService(cfg).run(args.serve or cfg.service_address)
+        return
+
+    # read lazily: the first search starts before a huge file is fully read
+    queries = iter_queries(cfg.queries_file)
+    first = next(queries, None)
+    if first is None:
         logger.error("queries file is empty or missing: %s", cfg.queries_file)
         raise SystemExit(1)
+    queries = itertools.chain([first], queries)
+
+    if args.workers > 1:
+        logger.info("Starting parser with %d workers...", args.workers)
+        run_sharded(cfg, args.workers, resume=args.resume)
+        return
 
     parser = Parser(cfg)
     logger.info("Starting parser...")
-    parser.run(queries)
+    parser.run(queries, resume=args.resume)
 
 
 if __name__ == "__main__":
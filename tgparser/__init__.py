@@ -2,9 +2,25 @@
 __all__ = [
     "config",
     "logging_setup",
+    "metrics",
     "backoff",
+    "benchmark",
     "proxies",
     "accounts",
     "client",
+    "dialogs",
+    "filters",
     "parser",
+    "pipeline",
+    "preflight",
+    "queries",
+    "ratelimit",
+    "retry",
+    "scheduler",
+    "service",
+    "sharding",
+    "simulate",
+    "sessions",
+    "sinks",
+    "tracing",
 ]
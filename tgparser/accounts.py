@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
 import shutil
+import time
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Callable, Collection, Optional
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +20,49 @@ class AccountMeta:
     meta: dict = field(default_factory=dict)
 
 
+@dataclass
+class AccountHealth:
+    successes: int = 0
+    failures: int = 0
+    latency: float = 0.0          # EWMA of search latency, seconds
+    last_flood_at: float = 0.0    # monotonic time of the last FloodWait
+    available_at: float = 0.0     # cool-down / quarantine end (monotonic)
+    quarantines: int = 0          # consecutive quarantines, reset on success
+    in_use: bool = False
+    dead: bool = False
+
+    def score(self, now: float, flood_memory: float = 600.0) -> float:
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        score = success_rate / (1.0 + self.latency)
+        if self.last_flood_at and now - self.last_flood_at < flood_memory:
+            score *= 0.5
+        return score
+
+
 class AccountManager:
-    def __init__(self, accounts_dir: str, dead_dir: str, proxies: List[str] | None = None):
+    """Recyclable account pool.
+
+    Accounts are handed out by :meth:`acquire` in health-score order and come
+    back with :meth:`release`, optionally after a cool-down (FloodWait).
+    Transient failures :meth:`quarantine` an account with an exponentially
+    growing delay (an account that keeps failing is dropped from the run after
+    ``max_quarantines`` in a row); only :meth:`mark_dead` (definitive auth
+    errors) moves its files to ``dead_dir``.
+    """
+
+    def __init__(self, accounts_dir: str, dead_dir: str, quarantine_base: float = 60.0,
+                 quarantine_cap: float = 3600.0, max_quarantines: int = 5,
+                 include: Optional[Collection[str]] = None) -> None:
         self.accounts_dir = accounts_dir
         self.dead_dir = dead_dir
-        self.proxies = proxies or []
+        # restrict discovery to these JSON file names (a shard of Accounts/)
+        self.include = set(include) if include is not None else None
+        self.quarantine_base = quarantine_base
+        self.quarantine_cap = quarantine_cap
+        self.max_quarantines = max(1, max_quarantines)
         self._accounts: list[AccountMeta] = self._discover_accounts()
-        self._index = 0
+        self._health: dict[str, AccountHealth] = {a.session_path: AccountHealth() for a in self._accounts}
+        self._changed = asyncio.Event()
 
     def _discover_accounts(self) -> list[AccountMeta]:
         result: list[AccountMeta] = []
@@ -38,6 +76,8 @@ class AccountManager:
                 continue
             if not fname.lower().endswith(".json"):
                 continue
+            if self.include is not None and fname not in self.include:
+                continue
 
             try:
                 with open(full, "r", encoding="utf-8") as f:
@@ -61,22 +101,110 @@ class AccountManager:
         logger.info("Discovered %d accounts", len(result))
         return result
 
-    def has_next(self) -> bool:
-        return self._index < len(self._accounts)
-
-    def next_account(self) -> Optional[AccountMeta]:
-        if not self.has_next():
-            return None
-        acc = self._accounts[self._index]
-        self._index += 1
-        return acc
-
-    def pick_proxy_for_index(self, idx: int) -> Optional[str]:
-        if not self.proxies:
-            return None
-        return self.proxies[idx % len(self.proxies)]
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def health(self, acc: AccountMeta) -> AccountHealth:
+        return self._health[acc.session_path]
+
+    def alive(self) -> int:
+        return sum(1 for h in self._health.values() if not h.dead)
+
+    def usable(self) -> list[AccountMeta]:
+        return [a for a in self._accounts if not self._health[a.session_path].dead]
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    async def acquire(self, should_stop: Callable[[], bool] = lambda: False) -> Optional[AccountMeta]:
+        """Healthiest available account, waiting for cool-downs if needed.
+
+        Returns None when no live accounts remain or ``should_stop()`` turns true.
+        """
+        while not should_stop():
+            now = time.monotonic()
+            ready = [
+                a for a in self._accounts
+                if not self._health[a.session_path].dead
+                and not self._health[a.session_path].in_use
+                and self._health[a.session_path].available_at <= now
+            ]
+            if ready:
+                best = max(ready, key=lambda a: self._health[a.session_path].score(now))
+                self._health[best.session_path].in_use = True
+                return best
+
+            waiting = [h.available_at for h in self._health.values() if not h.dead and not h.in_use]
+            if not waiting and not any(h.in_use and not h.dead for h in self._health.values()):
+                return None
+            # wake up when the next cool-down ends or another account is released;
+            # re-check should_stop() at least once a second
+            timeout = min([max(0.0, t - now) for t in waiting] + [1.0])
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return None
+
+    def release(self, acc: AccountMeta, cooldown: float = 0.0) -> None:
+        health = self._health[acc.session_path]
+        health.in_use = False
+        if cooldown > 0:
+            health.available_at = max(health.available_at, time.monotonic() + cooldown)
+        self._notify()
+
+    def release_all(self) -> None:
+        """Return accounts left in use by cancelled workers."""
+        for health in self._health.values():
+            health.in_use = False
+        self._notify()
+
+    def record_success(self, acc: AccountMeta, latency: float) -> None:
+        health = self._health[acc.session_path]
+        health.successes += 1
+        health.quarantines = 0
+        health.latency = latency if health.latency == 0.0 else 0.3 * latency + 0.7 * health.latency
+
+    def seed_latency(self, acc: AccountMeta, latency: float) -> None:
+        """Start the latency estimate from a measured round trip (e.g. the preflight connect)."""
+        health = self._health[acc.session_path]
+        if health.latency == 0.0:
+            health.latency = latency
+
+    def record_failure(self, acc: AccountMeta) -> None:
+        self._health[acc.session_path].failures += 1
+
+    def record_flood(self, acc: AccountMeta, seconds: float) -> None:
+        health = self._health[acc.session_path]
+        health.last_flood_at = time.monotonic()
+        health.available_at = max(health.available_at, health.last_flood_at + seconds)
+
+    def quarantine(self, acc: AccountMeta, reason: object = None) -> float:
+        """Take ``acc`` out of rotation for a while after a transient failure."""
+        health = self._health[acc.session_path]
+        if health.quarantines >= self.max_quarantines:
+            logger.error("Account keeps failing, dropped from this run: %s (%s)", acc.json_path or acc.session_path, reason)
+            self.disable(acc)
+            return 0.0
+        delay = min(self.quarantine_cap, self.quarantine_base * (2 ** health.quarantines))
+        health.quarantines += 1
+        health.failures += 1
+        health.in_use = False
+        health.available_at = time.monotonic() + delay
+        logger.warning("Account quarantined for %ds: %s (%s)", int(delay), acc.json_path or acc.session_path, reason)
+        self._notify()
+        return delay
+
+    def disable(self, acc: AccountMeta) -> None:
+        """Drop ``acc`` from this run without touching its files (e.g. bad config)."""
+        health = self._health[acc.session_path]
+        health.dead = True
+        health.in_use = False
+        self._notify()
 
     def mark_dead(self, acc: AccountMeta) -> None:
+        self.disable(acc)
         os.makedirs(self.dead_dir, exist_ok=True)
         try:
             if os.path.exists(acc.session_path):
@@ -1,24 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import random
-import time
-from typing import Callable
 
+from . import metrics, tracing
 
-def smart_sleep(retry: int, base: float, cap: float) -> None:
-    """Exponential backoff + jitter."""
+
+def backoff_delay(retry: int, base: float, cap: float) -> float:
+    """Exponential backoff + jitter, in seconds."""
     delay = min(cap, base * (2 ** retry))
     jitter = random.uniform(0.5, 1.5)
-    time.sleep(delay * jitter)
+    return delay * jitter
 
 
-def with_backoff(func: Callable, *, base: float, cap: float, retries: int = 5):
-    last_exc = None
-    for attempt in range(retries):
-        try:
-            return func()
-        except Exception as exc:  # noqa: BLE001
-            last_exc = exc
-            smart_sleep(attempt, base=base, cap=cap)
-    if last_exc:
-        raise last_exc
+async def smart_sleep_async(retry: int, base: float, cap: float) -> None:
+    """Exponential backoff + jitter; only suspends the calling task."""
+    delay = backoff_delay(retry, base, cap)
+    metrics.inc("tgparser_backoff_sleeps_total")
+    metrics.inc("tgparser_backoff_sleep_seconds_total", delay)
+    with tracing.span("backoff.sleep", cat="backoff", retry=retry):
+        await asyncio.sleep(delay)
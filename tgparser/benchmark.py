@@ -0,0 +1,176 @@
+"""Offline throughput benchmark: ``python -m tgparser.benchmark``.
+
+Runs :class:`Parser` against the simulated backend from :mod:`tgparser.simulate`
+for a set of scenarios and reports queries/s, results/s, RPCs per unique
+entity and RPC latency percentiles. No network or real accounts are used.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+
+from .config import Config, load_config
+from .logging_setup import setup_logging
+from .parser import Parser
+from .simulate import SimProfile, SimStats, fake_client_factory, make_session_file
+
+
+SCENARIOS: dict[str, SimProfile] = {
+    "baseline": SimProfile(latency=0.05),
+    "jitter": SimProfile(latency=0.05, latency_dist="lognormal", latency_sigma=1.0),
+    "flood": SimProfile(latency=0.05, flood_rate=0.02, flood_seconds=3),
+    "flaky": SimProfile(latency=0.05, error_rate=0.05),
+    "overlap": SimProfile(latency=0.05, overlap=0.6, shared_pool=300),
+    "fallback": SimProfile(latency=0.05, search_rpc_error_rate=0.5, dialogs=2000),
+}
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    elapsed: float
+    queries: int
+    results: int
+    rpcs: int
+    floods: int
+    errors: int
+    p50_ms: float
+    p99_ms: float
+
+    @property
+    def queries_per_s(self) -> float:
+        return self.queries / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def results_per_s(self) -> float:
+        return self.results / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def rpcs_per_entity(self) -> float:
+        return self.rpcs / self.results if self.results else 0.0
+
+
+def _bench_config(cfg: Config, workdir: str, rps: Optional[float]) -> Config:
+    """``cfg`` with all state redirected to ``workdir`` and nothing persisted across runs."""
+    cfg = replace(
+        cfg,
+        accounts_dir=os.path.join(workdir, "Accounts"),
+        dead_dir=os.path.join(workdir, "Accounts", "dead"),
+        proxy_file=os.path.join(workdir, "proxy.txt"),
+        proxy_probe=False,
+        results_channels=os.path.join(workdir, "results_channels.txt"),
+        results_chats=os.path.join(workdir, "results_chats.txt"),
+        results_file=os.path.join(workdir, "results"),
+        seen_db=None,
+        journal_file=None,
+        count_cache_db=None,
+        query_cache_db=None,
+        metrics_port=None,
+        metrics_file=None,
+        trace_file=None,
+    )
+    if rps is not None:
+        cfg = replace(
+            cfg,
+            rate_account_rps=rps, rate_account_burst=max(1.0, rps),
+            rate_count_rps=rps, rate_count_burst=max(1.0, rps),
+            rate_proxy_rps=rps * 10, rate_proxy_burst=max(1.0, rps * 10),
+        )
+    return cfg
+
+
+def _make_accounts(path: str, n: int) -> None:
+    os.makedirs(path, exist_ok=True)
+    for i in range(n):
+        with open(os.path.join(path, f"bench{i}.json"), "w", encoding="utf-8") as f:
+            json.dump({"app_id": 1, "app_hash": "bench", "session_file": f"bench{i}.session"}, f)
+        make_session_file(os.path.join(path, f"bench{i}.session"))
+
+
+def run_scenario(name: str, profile: SimProfile, cfg: Config, queries: list[str],
+                 accounts: int, rps: Optional[float] = None) -> BenchResult:
+    with tempfile.TemporaryDirectory(prefix="tgparser-bench-") as workdir:
+        bench_cfg = _bench_config(cfg, workdir, rps)
+        _make_accounts(bench_cfg.accounts_dir, accounts)
+        stats = SimStats()
+        parser = Parser(bench_cfg, client_factory=fake_client_factory(profile=profile, stats=stats))
+        started = time.perf_counter()
+        parser.run(queries)
+        elapsed = time.perf_counter() - started
+
+    return BenchResult(
+        scenario=name,
+        elapsed=elapsed,
+        queries=parser.scheduler.completed,
+        results=parser.sink.written if parser.sink is not None else 0,
+        rpcs=sum(n for kind, n in stats.calls.items() if kind != "connect"),
+        floods=stats.floods,
+        errors=stats.errors,
+        p50_ms=1000 * stats.percentile(50),
+        p99_ms=1000 * stats.percentile(99),
+    )
+
+
+def _print_table(results: list[BenchResult]) -> None:
+    header = f"{'scenario':<10} {'time,s':>7} {'queries/s':>10} {'results/s':>10} {'RPC/entity':>11} {'p50,ms':>8} {'p99,ms':>8} {'floods':>7} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.scenario:<10} {r.elapsed:>7.2f} {r.queries_per_s:>10.1f} {r.results_per_s:>10.1f} "
+            f"{r.rpcs_per_entity:>11.2f} {r.p50_ms:>8.1f} {r.p99_ms:>8.1f} {r.floods:>7} {r.errors:>7}"
+        )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Offline parser benchmark on a simulated Telegram backend")
+    ap.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                    help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    ap.add_argument("--queries", type=int, default=50, help="number of base queries (default: 50)")
+    ap.add_argument("--accounts", type=int, default=8, help="number of simulated accounts (default: 8)")
+    ap.add_argument("--rps", type=float, default=20.0,
+                    help="per-account request rate; 0 keeps RATE_* from the environment (default: 20)")
+    ap.add_argument("--deep", action="store_true", help="keep DEEP_SEARCH settings instead of disabling it")
+    ap.add_argument("--json", action="store_true", help="print one JSON object per scenario")
+    args = ap.parse_args(argv)
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    cfg = load_config()
+    setup_logging(cfg)
+    # keep the report readable; LOG_LEVEL=DEBUG still shows everything
+    if cfg.log_level != "DEBUG":
+        logging.getLogger("tgparser").setLevel(logging.WARNING)
+    cfg = replace(cfg, limit=10**9)
+    if not args.deep:
+        cfg = replace(cfg, deep_search_enabled=False)
+
+    queries = [f"bench {i}" for i in range(args.queries)]
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        result = run_scenario(name, SCENARIOS[name], cfg, queries, args.accounts, rps=args.rps or None)
+        results.append(result)
+        if args.json:
+            print(json.dumps({
+                **asdict(result),
+                "queries_per_s": round(result.queries_per_s, 3),
+                "results_per_s": round(result.results_per_s, 3),
+                "rpcs_per_entity": round(result.rpcs_per_entity, 3),
+            }))
+    if not args.json:
+        _print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import time
+from typing import Any, Optional
+
+from telethon.extensions import BinaryReader
+
+
+logger = logging.getLogger(__name__)
+
+
+def _open_db(path: Optional[str]) -> sqlite3.Connection:
+    """SQLite connection tuned for small hot-path writes; None means in-memory."""
+    if not path:
+        return sqlite3.connect(":memory:")
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    # shared by --workers processes: wait for the other writers instead of failing
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+class CountCache:
+    """Participant counts keyed by marked peer id, with TTL and size bound.
+
+    Entries older than ``ttl`` seconds are treated as misses. When the table
+    grows past ``max_entries`` the least recently refreshed rows are evicted.
+    """
+
+    def __init__(self, path: Optional[str], ttl: float = 86400.0, max_entries: int = 1_000_000,
+                 commit_every: int = 200) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.commit_every = max(1, commit_every)
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._db: Optional[sqlite3.Connection] = _open_db(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS counts ("
+            " peer_id INTEGER PRIMARY KEY, count INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS counts_updated ON counts (updated)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+
+    def get(self, key: Optional[int]) -> Optional[int]:
+        if key is None or self._db is None:
+            return None
+        row = self._db.execute("SELECT count, updated FROM counts WHERE peer_id = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return int(row[0])
+
+    def put(self, key: Optional[int], count: Optional[int]) -> None:
+        if key is None or count is None or self._db is None:
+            return
+        self._db.execute(
+            "INSERT INTO counts (peer_id, count, updated) VALUES (?, ?, ?)"
+            " ON CONFLICT(peer_id) DO UPDATE SET count = excluded.count, updated = excluded.updated",
+            (key, int(count), time.time()),
+        )
+        # upper bound (updates are counted too); _evict() re-counts exactly
+        self._size += 1
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def _evict(self) -> None:
+        self._size = self._db.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM counts WHERE peer_id IN (SELECT peer_id FROM counts ORDER BY updated LIMIT ?)",
+                (excess,),
+            )
+            self._size -= excess
+            logger.debug("Count cache evicted %d entries", excess)
+
+    def flush(self) -> None:
+        if self._db is None or not self._pending:
+            return
+        if self._size > self.max_entries:
+            self._evict()
+        self._db.commit()
+        self._pending = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self.flush()
+                self._db.close()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to close count cache %s: %s", self.path, exc)
+            self._db = None
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def _pack(entities: list[Any]) -> bytes:
+    out = bytearray()
+    for ent in entities:
+        data = bytes(ent)
+        out += struct.pack("<I", len(data)) + data
+    return bytes(out)
+
+
+def _unpack(blob: bytes) -> list[Any]:
+    out = []
+    pos = 0
+    while pos < len(blob):
+        (size,) = struct.unpack_from("<I", blob, pos)
+        pos += 4
+        with BinaryReader(blob[pos:pos + size]) as reader:
+            out.append(reader.tgread_object())
+        pos += size
+    return out
+
+
+class QueryCache:
+    """contacts.Search results keyed by (normalized query, search type, limit).
+
+    Entities are stored as raw TL bytes (rehydrated on a hit) next to their
+    ids and access hashes. Channel access hashes are bound to the account
+    that received them, so with ``per_account`` (set whenever enrichment RPCs
+    are made for the results) the key includes the account as well and one
+    account never gets another's entities. Entries expire after ``ttl``
+    seconds; past ``max_entries`` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: Optional[str], ttl: float = 21600.0, max_entries: int = 100_000,
+                 scope: str = "all", per_account: bool = False, commit_every: int = 50) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.scope = scope
+        self.per_account = per_account
+        self.commit_every = max(1, commit_every)
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._db: Optional[sqlite3.Connection] = _open_db(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS queries ("
+            " key TEXT PRIMARY KEY, entities TEXT NOT NULL, payload BLOB NOT NULL,"
+            " created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS queries_used ON queries (used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+
+    def _key(self, query: str, limit: int, account: str) -> str:
+        if self.per_account:
+            return f"{self.scope}|{account}|{limit}|{normalize_query(query)}"
+        return f"{self.scope}|{limit}|{normalize_query(query)}"
+
+    def get(self, query: str, limit: int, account: str = "") -> Optional[list[Any]]:
+        if self._db is None:
+            return None
+        key = self._key(query, limit, account)
+        row = self._db.execute("SELECT payload, created FROM queries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        try:
+            entities = _unpack(row[0])
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Corrupt query cache entry %r: %s", key, exc)
+            self.misses += 1
+            return None
+        self._db.execute("UPDATE queries SET used = ? WHERE key = ?", (now, key))
+        self._touch()
+        self.hits += 1
+        return entities
+
+    def put(self, query: str, limit: int, entities: list[Any], account: str = "") -> None:
+        if self._db is None:
+            return
+        now = time.time()
+        ids = [[getattr(e, "id", None), getattr(e, "access_hash", None)] for e in entities]
+        self._db.execute(
+            "INSERT OR REPLACE INTO queries (key, entities, payload, created, used) VALUES (?, ?, ?, ?, ?)",
+            (self._key(query, limit, account), json.dumps(ids), _pack(entities), now, now),
+        )
+        # upper bound (replacements are counted too); _evict() re-counts exactly
+        self._size += 1
+        self._touch()
+
+    def _touch(self) -> None:
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def _evict(self) -> None:
+        self._size = self._db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM queries WHERE key IN (SELECT key FROM queries ORDER BY used LIMIT ?)",
+                (excess,),
+            )
+            self._size -= excess
+            logger.debug("Query cache evicted %d entries", excess)
+
+    def flush(self) -> None:
+        if self._db is None or not self._pending:
+            return
+        if self._size > self.max_entries:
+            self._evict()
+        self._db.commit()
+        self._pending = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self.flush()
+                self._db.close()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to close query cache %s: %s", self.path, exc)
+            self._db = None
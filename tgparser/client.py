@@ -1,85 +1,209 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Optional, List
+import time
+from collections import Counter
+from typing import Any, Callable, Optional, List
 
 from telethon import TelegramClient, errors, functions, types
 from telethon.tl.functions.channels import GetFullChannelRequest, GetParticipantsRequest
 from telethon.tl.functions.messages import GetFullChatRequest
 from telethon.tl.types import ChannelParticipantsRecent
 
-from .proxies import parse_proxy
+from . import metrics, tracing
+from .cache import CountCache, QueryCache
+from .dedup import entity_key
+from .dialogs import DialogIndex
+from .proxies import ProxyPool, parse_proxy
+from .ratelimit import COUNT, SEARCH, RateLimiter
+from .retry import AUTH_ERRORS, CircuitOpenError, ClientClosedError, RetryPolicy
+from .sessions import SessionStore
 
 
 logger = logging.getLogger(__name__)
 
 
+# (session_path, api_id, api_hash, proxy=...) -> TelegramClient-compatible object
+ClientFactory = Callable[..., Any]
+
+COUNT_REQUESTS = ("GetParticipantsRequest", "GetFullChannelRequest", "GetFullChatRequest")
+
+
+def payload_count(entity) -> int | None:
+    """Member count carried by the entity itself (e.g. contacts.Search results)."""
+    return getattr(entity, "participants_count", None) or getattr(entity, "members_count", None)
+
+
 class TelethonWrapper:
-    def __init__(self, session_path: str, api_id: int, api_hash: str, proxy_str: Optional[str] = None):
+    def __init__(
+        self,
+        session_path: str,
+        api_id: int,
+        api_hash: str,
+        proxy_str: Optional[str] = None,
+        client_factory: Optional[ClientFactory] = None,
+        limiter: Optional[RateLimiter] = None,
+        count_cache: Optional[CountCache] = None,
+        query_cache: Optional[QueryCache] = None,
+        proxy_pool: Optional[ProxyPool] = None,
+        dialog_refresh: float = 600.0,
+        session_store: Optional[SessionStore] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
         self.session_path = session_path
         self.api_id = api_id
         self.api_hash = api_hash
         self.proxy_str = proxy_str
+        self.client_factory = client_factory or TelegramClient
+        self.limiter = limiter
+        self.count_cache = count_cache
+        self.query_cache = query_cache
+        self.proxy_pool = proxy_pool
+        self.dialogs = DialogIndex(refresh_interval=dialog_refresh)
+        self.session_store = session_store
+        self.retry = retry or RetryPolicy()
+        self.rpc_calls: Counter[str] = Counter()
         self.client: Optional[TelegramClient] = None
+        self.closed = False    # disconnected here; queued hits may still reference the wrapper
 
     def _build_client(self) -> None:
         proxy = parse_proxy(self.proxy_str) if self.proxy_str else None
         logger.debug("Proxy parsed for %s: %s", self.session_path, proxy)
-        self.client = TelegramClient(self.session_path, self.api_id, self.api_hash, proxy=proxy)
+        session = self.session_store.open(self.session_path) if self.session_store is not None else self.session_path
+        self.closed = False
+        self.client = self.client_factory(session, self.api_id, self.api_hash, proxy=proxy)
+        if self.limiter is not None:
+            # surface every FloodWait to the limiter instead of letting Telethon sleep on it
+            self.client.flood_sleep_threshold = 0
 
-    def start(self) -> None:
+    async def start(self) -> None:
         self._build_client()
         try:
-            self.client.start()
+            with tracing.span("client.start", cat="account", session=self.session_path, proxy=metrics.proxy_label(self.proxy_str)):
+                await self.client.start()
             logger.info("Client started: %s", self.session_path)
         except Exception as exc:  # noqa: BLE001
             logger.exception("Failed to start client %s: %s", self.session_path, exc)
             raise
 
-    def disconnect(self) -> None:
+    async def connect(self) -> bool:
+        """Connect without :meth:`start`'s interactive login; True if the session is authorized."""
+        self._build_client()
+        with tracing.span("client.connect", cat="account", session=self.session_path, proxy=metrics.proxy_label(self.proxy_str)):
+            await self.client.connect()
+            return bool(await self.client.is_user_authorized())
+
+    async def disconnect(self) -> None:
+        self.closed = True
         if self.client:
             try:
-                self.client.disconnect()
+                await self.client.disconnect()
             except Exception:  # noqa: BLE001
                 pass
+        if self.session_store is not None:
+            self.session_store.checkpoint([self.session_path])
+
+    # --- Thin async wrappers around Telethon calls ---
 
-    # --- Synchronous wrappers around async Telethon calls ---
+    def _report_proxy(self, latency: Optional[float] = None, ok: bool = True) -> None:
+        if self.proxy_pool is not None:
+            self.proxy_pool.report(self.proxy_str, latency=latency, ok=ok)
 
-    def _invoke(self, request):
-        return self.client.loop.run_until_complete(self.client(request))
+    async def _invoke(self, request):
+        name = type(request).__name__
+        return await self.retry.call(lambda: self._invoke_once(request, name), op=name, proxy=self.proxy_str)
 
-    def _gather_dialogs(self, limit: int):
-        return self.client.loop.run_until_complete(self.client.get_dialogs(limit=limit))
+    async def _invoke_once(self, request, name: str):
+        if self.closed:
+            raise ClientClosedError(self.session_path)
+        self.rpc_calls[name] += 1
+        op = COUNT if name in COUNT_REQUESTS else SEARCH
+        if self.limiter is not None:
+            with tracing.span("ratelimit.wait", cat="rpc"):
+                await self.limiter.acquire(self.session_path, self.proxy_str, op)
+        started = time.monotonic()
+        try:
+            with tracing.span(name, cat="rpc"):
+                res = await self.client(request)
+        except errors.FloodWaitError as exc:
+            metrics.inc("tgparser_rpc_errors_total", request=name, error=type(exc).__name__)
+            metrics.inc(
+                "tgparser_floodwait_seconds_total", exc.seconds,
+                account=metrics.account_label(self.session_path), proxy=metrics.proxy_label(self.proxy_str),
+            )
+            if self.limiter is not None:
+                self.limiter.on_flood_wait(self.session_path, self.proxy_str, exc.seconds, op)
+            raise
+        except (ConnectionError, OSError, asyncio.TimeoutError) as exc:
+            if self.closed:
+                # dropped by us mid-call: not the proxy's fault
+                raise ClientClosedError(self.session_path) from exc
+            metrics.inc("tgparser_rpc_errors_total", request=name, error=type(exc).__name__)
+            self._report_proxy(ok=False)
+            raise
+        except Exception as exc:  # noqa: BLE001
+            metrics.inc("tgparser_rpc_errors_total", request=name, error=type(exc).__name__)
+            raise
+        latency = time.monotonic() - started
+        metrics.observe("tgparser_rpc_latency_seconds", latency, request=name)
+        self._report_proxy(latency=latency)
+        if self.limiter is not None:
+            self.limiter.on_success(self.session_path, self.proxy_str, op)
+        return res
 
-    def search_public(self, query: str, limit: int = 50) -> List[types.TypeChat]:
+    async def search_public(self, query: str, limit: int = 50) -> List[types.TypeChat]:
         if not self.client:
             raise RuntimeError("Client not started")
+        if self.query_cache is not None:
+            cached = self.query_cache.get(query, limit, self.session_path)
+            if cached is not None:
+                return cached
         try:
-            res = self._invoke(functions.contacts.SearchRequest(q=query, limit=limit))
-            return list(res.chats)
+            res = await self._invoke(functions.contacts.SearchRequest(q=query, limit=limit))
+            chats = list(res.chats)
+            if self.query_cache is not None:
+                self.query_cache.put(query, limit, chats, self.session_path)
+            return chats
+        except (errors.FloodWaitError, CircuitOpenError, *AUTH_ERRORS):
+            # an open breaker says nothing about the query: the caller retries it later
+            raise
         except errors.RPCError as exc:
-            logger.warning("SearchRequest RPCError: %s. Fallback to local dialogs.", exc)
-            dialogs = []
-            try:
-                for d in self._gather_dialogs(limit=limit):
-                    if d.name and query.lower() in d.name.lower():
-                        dialogs.append(d.entity)
-            except Exception as ex:  # noqa: BLE001
-                logger.error("get_dialogs failed: %s", ex)
-            return dialogs
-        except Exception as exc:  # noqa: BLE001
-            logger.error("search_public unexpected error: %s", exc)
-            return []
+            logger.warning("SearchRequest failed: %s. Fallback to local dialogs.", exc)
+            # fetched once per client and refreshed incrementally, not per query
+            await self.dialogs.ensure(self.client)
+            return self.dialogs.search(query, limit)
 
-    
-    def get_participants_count(self, entity) -> int | None:
+    async def get_participants_count(self, entity) -> int | None:
         if not self.client:
             return None
+        if self.closed:
+            # hits queued before the account was dropped keep their search-payload count
+            return payload_count(entity)
+        key = entity_key(entity)
+        if self.count_cache is not None:
+            count = self.count_cache.get(key)
+            if count is not None:
+                return count
+        if self.limiter is not None and self.limiter.cooldown(self.session_path, COUNT) > 0:
+            # a lookup would wait out this account's FloodWait in a shared enrich worker
+            return payload_count(entity)
+        with tracing.span("count.fetch", cat="count"):
+            count = await self._fetch_participants_count(entity)
+        if count is None:
+            # every lookup failed: the search payload's count is not worth caching
+            return payload_count(entity)
+        if self.count_cache is not None:
+            self.count_cache.put(key, count)
+        return count
+
+    async def _fetch_participants_count(self, entity) -> int | None:
+        """Count as reported by Telegram; None when no lookup succeeded."""
         try:
             # Prefer robust count via channels.GetParticipants (recent) which returns a total .count
             if isinstance(entity, types.Channel):
                 try:
-                    resp = self._invoke(GetParticipantsRequest(
+                    resp = await self._invoke(GetParticipantsRequest(
                         channel=entity,
                         filter=ChannelParticipantsRecent(),
                         offset=0,
@@ -88,10 +212,14 @@ class TelethonWrapper:
                     ))
                     if getattr(resp, "count", None) is not None:
                         return int(resp.count)
+                except (errors.FloodWaitError, CircuitOpenError, ClientClosedError) as exc:
+                    # the fallback would go to the same cooling-down account, breaker or closed client
+                    logger.debug("GetParticipantsRequest refused (%s), using the search payload", exc)
+                    return None
                 except Exception as exc:  # fallback to GetFullChannelRequest
                     logger.debug("GetParticipantsRequest failed, fallback to GetFullChannelRequest: %s", exc)
                     try:
-                        full = self._invoke(GetFullChannelRequest(channel=entity))
+                        full = await self._invoke(GetFullChannelRequest(channel=entity))
                         full_chat = getattr(full, "full_chat", None)
                         if full_chat is not None:
                             if getattr(full_chat, "participants_count", None) is not None:
@@ -103,7 +231,7 @@ class TelethonWrapper:
 
             if isinstance(entity, types.Chat):
                 try:
-                    full = self._invoke(GetFullChatRequest(chat_id=entity.id))
+                    full = await self._invoke(GetFullChatRequest(chat_id=entity.id))
                     if getattr(full, "full_chat", None) and getattr(full.full_chat, "participants", None):
                         participants = getattr(full.full_chat, "participants", None)
                         try:
@@ -113,13 +241,13 @@ class TelethonWrapper:
                 except Exception as exc:
                     logger.debug("GetFullChatRequest failed: %s", exc)
 
-            return getattr(entity, "participants_count", None) or getattr(entity, "members_count", None)
+            return None
         except errors.RPCError as exc:
             logger.warning("get_participants_count RPCError: %s", exc)
-            return getattr(entity, "participants_count", None) or getattr(entity, "members_count", None)
+            return None
         except Exception as exc:  # noqa: BLE001
             logger.error("get_participants_count error: %s", exc)
-            return getattr(entity, "participants_count", None) or getattr(entity, "members_count", None)
+            return None
 
     def get_link(self, entity) -> str | None:
         try:
@@ -4,6 +4,8 @@ import os
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from .filters import FLAG_MODES, USERNAME_MODES
+
 
 @dataclass(frozen=True)
 class Config:
@@ -12,26 +14,92 @@ class Config:
 
     search_type: str
     limit: int
+    count_strategy: str
+    dialog_refresh: float
+
+    filter_title_regex: str | None
+    filter_title_exclude_regex: str | None
+    filter_title_blocklist: tuple[str, ...]
+    filter_verified: str
+    filter_scam: str
+    filter_username: str
+    filter_min_members: int | None
+    filter_max_members: int | None
 
     accounts_dir: str
+    session_mode: str
+    preflight: bool
+    preflight_timeout: float
+    preflight_concurrency: int
     dead_dir: str
+    account_quarantine: float
+    account_quarantine_cap: float
+    flood_switch_seconds: float
     proxy_file: str
+    proxy_probe: bool
+    proxy_probe_timeout: float
+    proxy_cooldown: float
+    proxy_max_failures: int
     queries_file: str
 
     results_channels: str
     results_chats: str
+    results_format: str
+    results_file: str | None
+    results_flush_size: int
+    results_flush_interval: float
+    seen_db: str | None
+    journal_file: str | None
+    count_cache_db: str | None
+    count_cache_ttl: float
+    count_cache_max: int
+    query_cache_db: str | None
+    query_cache_ttl: float
+    query_cache_max: int
+    query_dedup_capacity: int
+    query_dedup_memory: int
 
     log_level: str
     log_file: str | None
     log_format: str
+    log_json: bool
+    log_sample_burst: int
+    log_sample_interval: float
+
+    metrics_port: int | None
+    metrics_host: str
+    metrics_file: str | None
+    metrics_interval: float
+    trace_file: str | None
+    service_address: str
 
     base_backoff: float
     backoff_cap: float
+    retry_network_attempts: int
+    retry_transient_attempts: int
+    breaker_threshold: int
+    breaker_reset: float
+
+    concurrency: int
+    query_max_attempts: int
+    enrich_workers: int
+    pipeline_queue_size: int
+
+    rate_account_rps: float
+    rate_account_burst: float
+    rate_count_rps: float
+    rate_count_burst: float
+    rate_proxy_rps: float
+    rate_proxy_burst: float
+    rate_min_rps: float
 
     deep_search_enabled: bool
     deep_letters: bool
     deep_digits: bool
     deep_min_len_gate: int
+    deep_adaptive: bool
+    deep_max_depth: int
+    deep_min_new_ratio: float
 
 
 def load_config() -> Config:
@@ -43,14 +111,64 @@ def load_config() -> Config:
 
     search_type = os.getenv("SEARCH_TYPE", "all").lower()
     limit = int(os.getenv("LIMIT", "50"))
+    count_strategy = os.getenv("COUNT_STRATEGY", "exact").lower()
+    if count_strategy not in ("exact", "fast", "skip"):
+        count_strategy = "exact"
+    dialog_refresh = float(os.getenv("DIALOG_REFRESH", "600"))
+
+    filter_title_regex = os.getenv("FILTER_TITLE_REGEX") or None
+    filter_title_exclude_regex = os.getenv("FILTER_TITLE_EXCLUDE_REGEX") or None
+    filter_title_blocklist = tuple(
+        w.strip() for w in os.getenv("FILTER_TITLE_BLOCKLIST", "").split(",") if w.strip()
+    )
+    filter_verified = os.getenv("FILTER_VERIFIED", "any").lower()
+    if filter_verified not in FLAG_MODES:
+        filter_verified = "any"
+    filter_scam = os.getenv("FILTER_SCAM", "any").lower()
+    if filter_scam not in FLAG_MODES:
+        filter_scam = "any"
+    filter_username = os.getenv("FILTER_USERNAME", "any").lower()
+    if filter_username not in USERNAME_MODES:
+        filter_username = "any"
+    filter_min_members = int(os.getenv("FILTER_MIN_MEMBERS", "") or 0) or None
+    filter_max_members = int(os.getenv("FILTER_MAX_MEMBERS", "") or 0) or None
 
     accounts_dir = os.getenv("ACCOUNTS_DIR", "Accounts")
+    session_mode = os.getenv("SESSION_MODE", "sqlite").lower()
+    if session_mode not in ("sqlite", "memory"):
+        session_mode = "sqlite"
+    preflight = os.getenv("PREFLIGHT", "1") not in ("0", "false", "False")
+    preflight_timeout = float(os.getenv("PREFLIGHT_TIMEOUT", "10"))
+    preflight_concurrency = max(1, int(os.getenv("PREFLIGHT_CONCURRENCY", "16")))
     dead_dir = os.getenv("DEAD_DIR", os.path.join(accounts_dir, "dead"))
+    account_quarantine = float(os.getenv("ACCOUNT_QUARANTINE", "60"))
+    account_quarantine_cap = float(os.getenv("ACCOUNT_QUARANTINE_CAP", "3600"))
+    flood_switch_seconds = float(os.getenv("FLOOD_SWITCH_SECONDS", "30"))
     proxy_file = os.getenv("PROXY_FILE", "proxy.txt")
+    proxy_probe = os.getenv("PROXY_PROBE", "1") not in ("0", "false", "False")
+    proxy_probe_timeout = float(os.getenv("PROXY_PROBE_TIMEOUT", "5"))
+    proxy_cooldown = float(os.getenv("PROXY_COOLDOWN", "300"))
+    proxy_max_failures = int(os.getenv("PROXY_MAX_FAILURES", "3"))
     queries_file = os.getenv("QUERIES_FILE", "queries.txt")
 
     results_channels = os.getenv("RESULTS_CHANNELS", "results_channels.txt")
     results_chats = os.getenv("RESULTS_CHATS", "results_chats.txt")
+    results_format = os.getenv("RESULTS_FORMAT", "text").lower()
+    if results_format not in ("text", "jsonl", "csv", "sqlite"):
+        results_format = "text"
+    results_file = os.getenv("RESULTS_FILE") or None
+    results_flush_size = max(1, int(os.getenv("RESULTS_FLUSH_SIZE", "100")))
+    results_flush_interval = float(os.getenv("RESULTS_FLUSH_INTERVAL", "2.0"))
+    seen_db = os.getenv("SEEN_DB", "seen.sqlite3") or None
+    journal_file = os.getenv("JOURNAL_FILE", "progress.journal") or None
+    count_cache_db = os.getenv("COUNT_CACHE_DB", "counts.sqlite3") or None
+    count_cache_ttl = float(os.getenv("COUNT_CACHE_TTL", "86400"))
+    count_cache_max = int(os.getenv("COUNT_CACHE_MAX", "1000000"))
+    query_cache_db = os.getenv("QUERY_CACHE_DB", "queries.sqlite3") or None
+    query_cache_ttl = float(os.getenv("QUERY_CACHE_TTL", "21600"))
+    query_cache_max = int(os.getenv("QUERY_CACHE_MAX", "100000"))
+    query_dedup_capacity = max(1, int(os.getenv("QUERY_DEDUP_CAPACITY", "10000000")))
+    query_dedup_memory = max(1, int(os.getenv("QUERY_DEDUP_MEMORY", "100000")))
 
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
     log_file = os.getenv("LOG_FILE")
@@ -58,33 +176,125 @@ def load_config() -> Config:
         "LOG_FORMAT",
         "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
     )
+    log_json = os.getenv("LOG_JSON", "0") not in ("0", "false", "False")
+    log_sample_burst = max(1, int(os.getenv("LOG_SAMPLE_BURST", "20")))
+    log_sample_interval = float(os.getenv("LOG_SAMPLE_INTERVAL", "10"))
+
+    metrics_port = int(os.getenv("METRICS_PORT", "0") or 0) or None
+    metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+    metrics_file = os.getenv("METRICS_FILE") or None
+    metrics_interval = max(1.0, float(os.getenv("METRICS_INTERVAL", "15")))
+    trace_file = os.getenv("TRACE_FILE") or None
+    service_address = os.getenv("SERVICE_ADDRESS", "tgparser.sock")
 
     base_backoff = float(os.getenv("BASE_BACKOFF", "1.0"))
     backoff_cap = float(os.getenv("BACKOFF_CAP", "60.0"))
+    retry_network_attempts = max(1, int(os.getenv("RETRY_NETWORK_ATTEMPTS", "3")))
+    retry_transient_attempts = max(1, int(os.getenv("RETRY_TRANSIENT_ATTEMPTS", "3")))
+    breaker_threshold = max(1, int(os.getenv("BREAKER_THRESHOLD", "5")))
+    breaker_reset = float(os.getenv("BREAKER_RESET", "30"))
+
+    concurrency = max(1, int(os.getenv("CONCURRENCY", "4")))
+    query_max_attempts = max(1, int(os.getenv("QUERY_MAX_ATTEMPTS", "3")))
+    enrich_workers = max(1, int(os.getenv("ENRICH_WORKERS", "8")))
+    pipeline_queue_size = max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", "100")))
+
+    rate_account_rps = float(os.getenv("RATE_ACCOUNT_RPS", "1.0"))
+    rate_account_burst = float(os.getenv("RATE_ACCOUNT_BURST", "3"))
+    rate_count_rps = float(os.getenv("RATE_COUNT_RPS", "5.0"))
+    rate_count_burst = float(os.getenv("RATE_COUNT_BURST", "10"))
+    rate_proxy_rps = float(os.getenv("RATE_PROXY_RPS", "10.0"))
+    rate_proxy_burst = float(os.getenv("RATE_PROXY_BURST", "20"))
+    rate_min_rps = float(os.getenv("RATE_MIN_RPS", "0.05"))
 
     deep_search_enabled = os.getenv("DEEP_SEARCH", "1") not in ("0", "false", "False")
     deep_letters = os.getenv("DEEP_LETTERS", "1") not in ("0", "false", "False")
     deep_digits = os.getenv("DEEP_DIGITS", "1") not in ("0", "false", "False")
     deep_min_len_gate = int(os.getenv("DEEP_MIN_LEN", "2"))
+    deep_adaptive = os.getenv("DEEP_ADAPTIVE", "0") not in ("0", "false", "False")
+    deep_max_depth = int(os.getenv("DEEP_MAX_DEPTH", "3"))
+    deep_min_new_ratio = float(os.getenv("DEEP_MIN_NEW_RATIO", "0.1"))
 
     return Config(
         tg_api_id=tg_api_id,
         tg_api_hash=tg_api_hash,
         search_type=search_type,
         limit=limit,
+        count_strategy=count_strategy,
+        dialog_refresh=dialog_refresh,
+        filter_title_regex=filter_title_regex,
+        filter_title_exclude_regex=filter_title_exclude_regex,
+        filter_title_blocklist=filter_title_blocklist,
+        filter_verified=filter_verified,
+        filter_scam=filter_scam,
+        filter_username=filter_username,
+        filter_min_members=filter_min_members,
+        filter_max_members=filter_max_members,
         accounts_dir=accounts_dir,
+        session_mode=session_mode,
+        preflight=preflight,
+        preflight_timeout=preflight_timeout,
+        preflight_concurrency=preflight_concurrency,
         dead_dir=dead_dir,
+        account_quarantine=account_quarantine,
+        account_quarantine_cap=account_quarantine_cap,
+        flood_switch_seconds=flood_switch_seconds,
         proxy_file=proxy_file,
+        proxy_probe=proxy_probe,
+        proxy_probe_timeout=proxy_probe_timeout,
+        proxy_cooldown=proxy_cooldown,
+        proxy_max_failures=proxy_max_failures,
         queries_file=queries_file,
         results_channels=results_channels,
         results_chats=results_chats,
+        results_format=results_format,
+        results_file=results_file,
+        results_flush_size=results_flush_size,
+        results_flush_interval=results_flush_interval,
+        seen_db=seen_db,
+        journal_file=journal_file,
+        count_cache_db=count_cache_db,
+        count_cache_ttl=count_cache_ttl,
+        count_cache_max=count_cache_max,
+        query_cache_db=query_cache_db,
+        query_cache_ttl=query_cache_ttl,
+        query_cache_max=query_cache_max,
+        query_dedup_capacity=query_dedup_capacity,
+        query_dedup_memory=query_dedup_memory,
         log_level=log_level,
         log_file=log_file,
         log_format=log_format,
+        log_json=log_json,
+        log_sample_burst=log_sample_burst,
+        log_sample_interval=log_sample_interval,
+        metrics_port=metrics_port,
+        metrics_host=metrics_host,
+        metrics_file=metrics_file,
+        metrics_interval=metrics_interval,
+        trace_file=trace_file,
+        service_address=service_address,
         base_backoff=base_backoff,
         backoff_cap=backoff_cap,
+        retry_network_attempts=retry_network_attempts,
+        retry_transient_attempts=retry_transient_attempts,
+        breaker_threshold=breaker_threshold,
+        breaker_reset=breaker_reset,
+        concurrency=concurrency,
+        query_max_attempts=query_max_attempts,
+        enrich_workers=enrich_workers,
+        pipeline_queue_size=pipeline_queue_size,
+        rate_account_rps=rate_account_rps,
+        rate_account_burst=rate_account_burst,
+        rate_count_rps=rate_count_rps,
+        rate_count_burst=rate_count_burst,
+        rate_proxy_rps=rate_proxy_rps,
+        rate_proxy_burst=rate_proxy_burst,
+        rate_min_rps=rate_min_rps,
         deep_search_enabled=deep_search_enabled,
         deep_letters=deep_letters,
         deep_digits=deep_digits,
         deep_min_len_gate=deep_min_len_gate,
+        deep_adaptive=deep_adaptive,
+        deep_max_depth=deep_max_depth,
+        deep_min_new_ratio=deep_min_new_ratio,
     )
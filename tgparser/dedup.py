@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from telethon import utils
+
+
+logger = logging.getLogger(__name__)
+
+
+def entity_key(entity) -> Optional[int]:
+    """Marked peer id (channels and chats never collide), or None if unknown."""
+    try:
+        return utils.get_peer_id(entity)
+    except Exception:  # noqa: BLE001
+        eid = getattr(entity, "id", None)
+        return int(eid) if eid is not None else None
+
+
+class SeenIndex:
+    """Entities already written to the results, persisted in SQLite.
+
+    :meth:`add` claims a key for this run; keys reach the ``seen`` table
+    (integer primary key, so O(log n) even with millions of rows) through
+    :meth:`persist` once their records are written, and :meth:`release`
+    drops the claim of a hit that was never written. Hits lost to an
+    interruption, a filter or a failed write are therefore not skipped later.
+
+    Memory stays bounded: claims are at most the results in flight (every
+    claim holds a LIMIT slot) and leave memory once persisted, and keys found
+    in the table are kept in an LRU of ``cache_size`` entries. Without a
+    database the claims are all there is and last for the run. Inserts are
+    committed in batches; call :meth:`close` to flush the tail.
+
+    With ``readonly`` the table is only consulted (a missing file means an
+    empty index) and :meth:`persist` is a no-op: the shards of a sharded run
+    check the index their collector writes.
+    """
+
+    def __init__(self, path: Optional[str], commit_every: int = 500, readonly: bool = False,
+                 cache_size: int = 100_000) -> None:
+        self.path = path
+        self.commit_every = max(1, commit_every)
+        self.readonly = readonly
+        self.cache_size = max(1, cache_size)
+        self._claimed: set[int] = set()
+        self._hot: OrderedDict[int, None] = OrderedDict()
+        self._pending = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path and readonly:
+            if os.path.exists(path):
+                self._db = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+        elif path:
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen (peer_id INTEGER PRIMARY KEY) WITHOUT ROWID")
+            self._db.commit()
+
+    def __contains__(self, key: int) -> bool:
+        if key in self._claimed:
+            return True
+        if key in self._hot:
+            self._hot.move_to_end(key)
+            return True
+        if self._db is None:
+            return False
+        row = self._db.execute("SELECT 1 FROM seen WHERE peer_id = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        self._hot[key] = None
+        if len(self._hot) > self.cache_size:
+            self._hot.popitem(last=False)
+        return True
+
+    def remember(self, keys) -> None:
+        """Treat ``keys`` as seen for this run without persisting them."""
+        self._claimed.update(keys)
+
+    def add(self, key: Optional[int]) -> bool:
+        """Claim ``key`` for this run; returns False if it had been seen before."""
+        if key is None:
+            return True
+        if key in self:
+            return False
+        self._claimed.add(key)
+        return True
+
+    def release(self, key: Optional[int]) -> None:
+        """Drop the claim on ``key``: its hit was not written after all."""
+        if key is not None:
+            self._claimed.discard(key)
+
+    def persist(self, keys: Iterable[Optional[int]]) -> None:
+        """Store written ``keys`` so later runs skip them."""
+        if self._db is None or self.readonly:
+            return
+        rows = [(key,) for key in keys if key is not None]
+        if not rows:
+            return
+        self._db.executemany("INSERT OR IGNORE INTO seen (peer_id) VALUES (?)", rows)
+        # the table answers for them now (this connection sees its own inserts)
+        self._claimed.difference_update(key for key, in rows)
+        self._pending += len(rows)
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._db is not None and self._pending:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self.flush()
+                self._db.close()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to close seen index %s: %s", self.path, exc)
+            self._db = None
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(key))
+
+    def add(self, key: str) -> bool:
+        """Set ``key``'s bits; returns True if they were all set already (maybe seen)."""
+        seen = True
+        for i in self._indexes(key):
+            mask = 1 << (i & 7)
+            if not self._bits[i >> 3] & mask:
+                self._bits[i >> 3] |= mask
+                seen = False
+        return seen
+
+
+class SpillSet:
+    """Exact string set with bounded memory.
+
+    A Bloom filter answers most "never seen" lookups; exact keys are kept in
+    memory up to ``memory_limit`` and then spilled to a temporary SQLite file,
+    which is only consulted when the filter reports a possible hit. Past
+    ``capacity`` keys the filter's false-positive rate grows, costing more disk
+    lookups but never correctness.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, memory_limit: int = 100_000,
+                 spill_dir: Optional[str] = None) -> None:
+        self.memory_limit = max(1, memory_limit)
+        self.spill_dir = spill_dir
+        self._bloom = BloomFilter(capacity)
+        self._mem: set[str] = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self.spilled = 0
+
+    def _on_disk(self, key: str) -> bool:
+        if self._db is None:
+            return False
+        return self._db.execute("SELECT 1 FROM keys WHERE k = ?", (key,)).fetchone() is not None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._bloom and (key in self._mem or self._on_disk(key))
+
+    def add(self, key: str) -> bool:
+        """Record ``key``; returns False if it had been added before."""
+        if self._bloom.add(key) and (key in self._mem or self._on_disk(key)):
+            return False
+        self._mem.add(key)
+        if len(self._mem) >= self.memory_limit:
+            self._spill()
+        return True
+
+    def _spill(self) -> None:
+        if self._db is None:
+            fd, self._path = tempfile.mkstemp(prefix="tgparser-keys-", suffix=".sqlite3", dir=self.spill_dir)
+            os.close(fd)
+            self._db = sqlite3.connect(self._path)
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("CREATE TABLE keys (k TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._db.executemany("INSERT OR IGNORE INTO keys (k) VALUES (?)", ((k,) for k in self._mem))
+        self._db.commit()
+        self.spilled += len(self._mem)
+        self._mem.clear()
+
+    def close(self) -> None:
+        self._mem.clear()
+        if self._db is not None:
+            try:
+                self._db.close()
+                os.remove(self._path)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to remove spill file %s: %s", self._path, exc)
+            self._db = None
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, Set
+from typing import Set
 
 
 @dataclass(frozen=True)
@@ -10,6 +10,18 @@ class DeepSearchConfig:
     letters: bool = True       # append ' a'..' z'
     digits: bool = True        # append ' 0'..' 9'
     min_len_gate: int = 2      # don't expand too-short queries
+    adaptive: bool = False     # expand only saturated queries, see AdaptiveExpander
+    max_depth: int = 3         # 'q' -> 'q a' -> 'q ab' -> 'q abc'
+    min_new_ratio: float = 0.1  # prune branches yielding fewer new entities
+
+
+def _suffix_chars(cfg: DeepSearchConfig) -> str:
+    chars = ""
+    if cfg.letters:
+        chars += "abcdefghijklmnopqrstuvwxyz"
+    if cfg.digits:
+        chars += "0123456789"
+    return chars
 
 
 def generate_variants(query: str, cfg: DeepSearchConfig) -> list[str]:
@@ -30,3 +42,53 @@ def generate_variants(query: str, cfg: DeepSearchConfig) -> list[str]:
     # return deterministic order: base first, then sorted rest
     rest = sorted([v for v in variants if v != q])
     return [q] + rest
+
+
+class AdaptiveExpander:
+    """Yield-driven deep search.
+
+    Only the base query is searched up front. When a search comes back full
+    (as many results as requested) and enough of them were new, its children
+    are scheduled: ``q`` -> ``q a`` .. ``q 9`` at the first level, then
+    ``q a`` -> ``q ab`` .. and so on up to ``max_depth``. Children inherit the
+    parent's share of new entities as their expected yield, which becomes the
+    scheduler priority (lower runs first).
+    """
+
+    def __init__(self, cfg: DeepSearchConfig) -> None:
+        self.cfg = cfg
+        self._chars = _suffix_chars(cfg)
+        self._depth: dict[str, int] = {}
+
+    def seeds(self, query: str) -> list[str]:
+        # seeds are depth 0 by default and not stored: memory stays flat for huge inputs
+        q = (query or "").strip()
+        return [q] if q else []
+
+    def _children(self, query: str, depth: int) -> list[str]:
+        sep = " " if depth == 0 else ""
+        return [f"{query}{sep}{ch}" for ch in self._chars]
+
+    def register(self, query: str, children: list[str]) -> None:
+        """Re-create an expansion recorded earlier (``--resume``)."""
+        depth = self._depth.setdefault(query, 0)
+        for child in children:
+            self._depth.setdefault(child, depth + 1)
+
+    def feedback(self, query: str, returned: int, requested: int, new: int) -> list[tuple[str, float]]:
+        """Children worth searching after ``query`` returned ``returned`` results
+        (``new`` of them unseen), as ``(query, priority)`` pairs."""
+        depth = self._depth.get(query, 0)
+        if not self.cfg.enabled or len(query) < self.cfg.min_len_gate or depth >= self.cfg.max_depth:
+            return []
+        if returned < requested or returned == 0:
+            return []  # not saturated: nothing hidden behind this prefix
+        ratio = new / returned
+        if ratio < self.cfg.min_new_ratio:
+            return []  # mostly duplicates: dead branch
+        out = []
+        for child in self._children(query, depth):
+            if child not in self._depth:
+                self._depth[child] = depth + 1
+                out.append((child, -ratio))
+        return out
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from . import tracing
+from .dedup import entity_key
+
+
+logger = logging.getLogger(__name__)
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class DialogIndex:
+    """Per-client dialog list with a trigram index over the dialog names.
+
+    The full list is fetched once with :meth:`ensure`; afterwards only the
+    ``increment`` most recent dialogs are re-fetched every ``refresh_interval``
+    seconds (new and renamed chats surface at the top). :meth:`search` answers
+    a substring query by intersecting trigram postings, so the fallback no
+    longer costs an RPC or a linear scan per query.
+    """
+
+    def __init__(self, refresh_interval: float = 600.0, increment: int = 100, retry_after: float = 60.0) -> None:
+        self.refresh_interval = refresh_interval
+        self.increment = increment
+        self.retry_after = retry_after
+        self._names: list[str] = []               # lowercased, by slot
+        self._entities: list[Any] = []
+        self._slots: dict[Any, int] = {}          # peer id -> slot
+        self._postings: dict[str, set[int]] = {}  # trigram -> slots
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def _index(self, dialog: Any) -> None:
+        entity = getattr(dialog, "entity", None)
+        name = (getattr(dialog, "name", None) or "").lower()
+        if entity is None or not name:
+            return
+        key = entity_key(entity)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._entities)
+            self._slots[key] = slot
+            self._names.append(name)
+            self._entities.append(entity)
+        else:
+            self._entities[slot] = entity
+            if self._names[slot] == name:
+                return
+            for gram in _trigrams(self._names[slot]):
+                self._postings[gram].discard(slot)
+            self._names[slot] = name
+        for gram in _trigrams(name):
+            self._postings.setdefault(gram, set()).add(slot)
+
+    async def ensure(self, client: Any) -> None:
+        """Load all dialogs on first use, then top up the most recent ones when due."""
+        if time.monotonic() < self._next_refresh:
+            return
+        async with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return
+            limit: Optional[int] = self.increment if self._loaded else None
+            try:
+                with tracing.span("dialogs.fetch", cat="rpc", limit=limit or 0):
+                    dialogs = await client.get_dialogs(limit=limit)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("get_dialogs failed: %s", exc)
+                self._next_refresh = time.monotonic() + self.retry_after
+                return
+            for dialog in dialogs:
+                self._index(dialog)
+            if not self._loaded:
+                logger.info("Indexed %d dialogs for local fallback search", len(self))
+            self._loaded = True
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def search(self, query: str, limit: int) -> list[Any]:
+        q = (query or "").strip().lower()
+        if not q or limit <= 0:
+            return []
+        if len(q) < 3:
+            slots = range(len(self._names))
+        else:
+            postings = sorted((self._postings.get(g, set()) for g in _trigrams(q)), key=len)
+            if not postings[0]:
+                return []
+            slots = sorted(set.intersection(*postings))
+        out = []
+        for slot in slots:
+            if q in self._names[slot]:
+                out.append(self._entities[slot])
+                if len(out) >= limit:
+                    break
+        return out
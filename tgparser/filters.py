@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+FLAG_MODES = ("any", "only", "exclude")
+USERNAME_MODES = ("any", "required", "none")
+
+
+@dataclass(frozen=True)
+class FilterConfig:
+    title_regex: Optional[str] = None          # keep only matching titles
+    title_exclude_regex: Optional[str] = None  # drop matching titles
+    title_blocklist: tuple[str, ...] = ()      # drop titles containing any of these words
+    verified: str = "any"                      # any | only | exclude
+    scam: str = "any"                          # any | only | exclude (scam or fake mark)
+    username: str = "any"                      # any | required | none
+    min_members: Optional[int] = None
+    max_members: Optional[int] = None
+
+
+def _flag_reason(mode: str, value: bool, name: str) -> Optional[str]:
+    if mode == "only" and not value:
+        return f"not_{name}"
+    if mode == "exclude" and value:
+        return name
+    return None
+
+
+class EntityFilter:
+    """Declarative filter over search results.
+
+    Everything :meth:`check` looks at (title, verified/scam/fake flags,
+    username, member count) is carried by the ``contacts.Search`` payload, so
+    entities are dropped before they cost an enrichment RPC or a slot of the
+    ``LIMIT`` budget. Only the member bounds may need the enriched count; see
+    :meth:`check_members`. Checks return a short reason, or None to keep.
+    """
+
+    def __init__(self, cfg: FilterConfig | None = None) -> None:
+        self.cfg = cfg or FilterConfig()
+        self._include = re.compile(self.cfg.title_regex, re.IGNORECASE) if self.cfg.title_regex else None
+        self._exclude = re.compile(self.cfg.title_exclude_regex, re.IGNORECASE) if self.cfg.title_exclude_regex else None
+        self._blocklist = tuple(w.lower() for w in self.cfg.title_blocklist if w)
+
+    @property
+    def active(self) -> bool:
+        return self.cfg != FilterConfig()
+
+    @property
+    def has_member_bounds(self) -> bool:
+        return self.cfg.min_members is not None or self.cfg.max_members is not None
+
+    def check_members(self, count: Optional[int]) -> Optional[str]:
+        if count is None:
+            return None
+        if self.cfg.min_members is not None and count < self.cfg.min_members:
+            return "min_members"
+        if self.cfg.max_members is not None and count > self.cfg.max_members:
+            return "max_members"
+        return None
+
+    def check(self, entity: Any, count: Optional[int] = None) -> Optional[str]:
+        """Reason to drop ``entity``; member bounds are checked only if ``count`` is known."""
+        cfg = self.cfg
+        title = getattr(entity, "title", None) or getattr(entity, "name", None) or ""
+        if self._include is not None and not self._include.search(title):
+            return "title_regex"
+        if self._exclude is not None and self._exclude.search(title):
+            return "title_exclude_regex"
+        if self._blocklist:
+            lowered = title.lower()
+            if any(word in lowered for word in self._blocklist):
+                return "title_blocklist"
+
+        reason = _flag_reason(cfg.verified, bool(getattr(entity, "verified", False)), "verified")
+        if reason is None:
+            marked = bool(getattr(entity, "scam", False) or getattr(entity, "fake", False))
+            reason = _flag_reason(cfg.scam, marked, "scam")
+        if reason is not None:
+            return reason
+
+        has_username = bool(getattr(entity, "username", None) or getattr(entity, "usernames", None))
+        if cfg.username == "required" and not has_username:
+            return "no_username"
+        if cfg.username == "none" and has_username:
+            return "username"
+        return self.check_members(count)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import IO, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JournalState:
+    """What a previous run left behind. During a run only ``cursors`` and
+    ``written`` are kept current, so memory does not grow with the query count."""
+
+    done: set[str] = field(default_factory=set)
+    cursors: dict[str, int] = field(default_factory=dict)   # query -> results already consumed
+    written: int = 0                                         # results written so far
+    written_ids: set[int] = field(default_factory=set)       # peer ids already in the results
+    expanded: list[tuple[str, list[tuple[str, float]]]] = field(default_factory=list)  # adaptive deep search
+
+
+class ProgressJournal:
+    """Append-only JSON-lines progress log used by ``--resume``.
+
+    A query is journaled only after all of its results reached the sink, so a
+    crash never marks unwritten work as done; the peer ids of every written
+    batch are logged too, so a resumed run never writes them twice. Each entry is one small buffered
+    write; the file is fsynced at most every ``fsync_interval`` seconds.
+    """
+
+    def __init__(self, path: Optional[str], resume: bool = False, fsync_interval: float = 5.0) -> None:
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.state = JournalState()
+        self._file: Optional[IO[str]] = None
+        self._last_sync = time.monotonic()
+        if not path:
+            return
+        if resume and os.path.exists(path):
+            self.state = self._replay(path)
+            logger.info(
+                "Resuming: %d queries done, %d partial, %d results written",
+                len(self.state.done), len(self.state.cursors), self.state.written,
+            )
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    @staticmethod
+    def _replay(path: str) -> JournalState:
+        state = JournalState()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn last line after a crash
+                    continue
+                query = entry.get("q")
+                if "ids" in entry:
+                    state.written_ids.update(entry["ids"])
+                elif "expand" in entry:
+                    state.expanded.append((query, [(c, float(p)) for c, p in entry["expand"]]))
+                elif entry.get("done"):
+                    state.done.add(query)
+                    state.cursors.pop(query, None)
+                elif query is not None:
+                    state.cursors[query] = int(entry.get("cursor", 0))
+                state.written = int(entry.get("written", state.written))
+        return state
+
+    def _append(self, entry: dict) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    def mark_written(self, ids: list[int], written: int) -> None:
+        """A batch of results reached the sink."""
+        self.state.written = written
+        self._append({"ids": ids, "written": written})
+
+    def mark_expanded(self, query: str, children: list[tuple[str, float]]) -> None:
+        """Adaptive deep search scheduled ``children`` of ``query``."""
+        self._append({"q": query, "expand": children})
+
+    def mark_done(self, query: str, written: int) -> None:
+        self.state.cursors.pop(query, None)
+        self.state.written = written
+        self._append({"q": query, "done": True, "written": written})
+
+    def mark_partial(self, query: str, cursor: int, written: int) -> None:
+        """``query`` stopped after ``cursor`` results (LIMIT reached)."""
+        self.state.cursors[query] = cursor
+        self.state.written = written
+        self._append({"q": query, "cursor": cursor, "written": written})
+
+    def close(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to close journal %s: %s", self.path, exc)
+            self._file = None
@@ -1,21 +1,118 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from . import metrics
 from .config import Config
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message (tracebacks included)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Lets at most ``burst`` records of one message template (per logger and
+    level) through every ``interval`` seconds and counts the rest.
+
+    Meant for the hot path (a "Searching ..." line per query, a fallback
+    warning per failed search); errors always pass. The first record of the
+    next window reports how many were suppressed.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 10.0) -> None:
+        super().__init__()
+        self.burst = max(1, burst)
+        self.interval = interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # (logger, level, template) -> [window start, passed, dropped]
+        self._windows: dict[tuple[str, int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.dropped += 1
+        metrics.inc("tgparser_log_dropped_total", logger=record.name)
+        return False
+
+
+_listener: Optional[QueueListener] = None
+_listener_pid = 0
+_sampler: Optional[SamplingFilter] = None
+
+
+def stop_logging() -> None:
+    """Drain the log queue and stop the writer thread."""
+    global _listener
+    if _listener is None or _listener_pid != os.getpid():
+        return
+    if _sampler is not None and _sampler.dropped:
+        logging.getLogger(__name__).info("Log sampling suppressed %d messages", _sampler.dropped)
+    _listener.stop()
+    _listener = None
+
+
 def setup_logging(cfg: Config) -> None:
-    handlers = []
-    stream_handler = logging.StreamHandler()
-    handlers.append(stream_handler)
+    """Log through a queue: callers only enqueue records, formatting and
+    writes happen on a background thread."""
+    global _listener, _listener_pid, _sampler
+    stop_logging()
 
+    formatter = JsonFormatter() if cfg.log_json else logging.Formatter(cfg.log_format)
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
     if cfg.log_file:
-        file_handler = logging.FileHandler(cfg.log_file, encoding="utf-8")
-        handlers.append(file_handler)
+        handlers.append(logging.FileHandler(cfg.log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue()
+    queue_handler = QueueHandler(log_queue)
+    # only merges the arguments (and any traceback) into the message
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    _sampler = None
+    if cfg.log_sample_interval > 0:
+        _sampler = SamplingFilter(cfg.log_sample_burst, cfg.log_sample_interval)
+        queue_handler.addFilter(_sampler)
 
     logging.basicConfig(
         level=getattr(logging, cfg.log_level, logging.INFO),
-        format=cfg.log_format,
-        handlers=handlers,
+        handlers=[queue_handler],
         force=True,
     )
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener_pid = os.getpid()
+    _listener.start()
+
+
+atexit.register(stop_logging)
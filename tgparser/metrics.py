@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .proxies import parse_proxy
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# label sets per metric; later ones are folded into a single "_other" series
+MAX_SERIES = 10_000
+
+# name -> (type, help)
+METRICS = {
+    "tgparser_rpc_latency_seconds": ("histogram", "RPC round trip time by request type."),
+    "tgparser_rpc_errors_total": ("counter", "Failed RPCs by request type and error."),
+    "tgparser_floodwait_seconds_total": ("counter", "FloodWait seconds imposed, by account and proxy."),
+    "tgparser_account_results_total": ("counter", "Search results returned, by account."),
+    "tgparser_account_unique_results_total": ("counter", "Search results not seen before, by account."),
+    "tgparser_query_results_total": ("counter", "Search results returned, by query."),
+    "tgparser_query_unique_results_total": ("counter", "Search results not seen before, by query."),
+    "tgparser_filtered_total": ("counter", "Search results dropped by filters, by reason and stage."),
+    "tgparser_retries_total": ("counter", "Retried calls by operation and error class."),
+    "tgparser_circuit_open_total": ("counter", "Circuit breaker trips, by breaker."),
+    "tgparser_log_dropped_total": ("counter", "Log records suppressed by sampling, by logger."),
+    "tgparser_backoff_sleeps_total": ("counter", "Retry backoff sleeps."),
+    "tgparser_backoff_sleep_seconds_total": ("counter", "Seconds spent in retry backoff sleeps."),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels, extra: Optional[tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered in Prometheus text format.
+
+    Updates are cheap dict operations under a lock, so they can sit on the hot
+    path; readers (HTTP endpoint, snapshots) may run in other threads. Each
+    metric keeps at most ``max_series`` label sets (per-query series would
+    otherwise grow with the input).
+    """
+
+    def __init__(self, max_series: int = MAX_SERIES) -> None:
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+
+    def _key(self, series: dict, labels: dict) -> Labels:
+        key = tuple(sorted(labels.items()))
+        if key not in series and len(series) >= self.max_series:
+            return tuple((k, "_other") for k, _ in key)
+        return key
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._key(series, labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = self._key(series, labels)
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._histograms)):
+                kind, help_text = METRICS.get(name, ("counter" if name in self._counters else "histogram", ""))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+                for labels, hist in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, n in zip(list(hist.buckets) + [float("inf")], hist.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {hist.sum!r}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    REGISTRY.observe(name, value, **labels)
+
+
+def account_label(session_path: str) -> str:
+    return os.path.splitext(os.path.basename(session_path))[0]
+
+
+def proxy_label(proxy_str: Optional[str]) -> str:
+    """``host:port`` of a proxy, never its credentials."""
+    if not proxy_str:
+        return "direct"
+    parsed = parse_proxy(proxy_str)
+    return f"{parsed[1]}:{parsed[2]}" if parsed else "unknown"
+
+
+def serve_http(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` in Prometheus text format from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics available at http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+def write_snapshot(path: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Atomically replace ``path`` with the current metrics."""
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.replace(tmp, path)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to write metrics snapshot %s: %s", path, exc)
+
+
+async def snapshot_loop(path: str, interval: float, registry: MetricsRegistry = REGISTRY) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        write_snapshot(path, registry)
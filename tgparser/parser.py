@@ -1,165 +1,769 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import os
 import time
-from typing import List
+from collections import Counter
+from typing import TYPE_CHECKING, Collection, Iterable, Iterator, Optional
 
 from telethon import errors, types
 
-from .accounts import AccountManager
-from .backoff import smart_sleep
-from .client import TelethonWrapper
+from . import metrics, tracing
+from .accounts import AccountManager, AccountMeta
+from .client import AUTH_ERRORS, COUNT_REQUESTS, ClientFactory, TelethonWrapper, payload_count
+from .cache import CountCache, QueryCache
 from .config import Config
-from .proxies import load_proxies
-from .deepsearch import DeepSearchConfig, generate_variants
+from .dedup import SeenIndex, SpillSet, entity_key
+from .filters import EntityFilter, FilterConfig
+from .journal import ProgressJournal
+from .pipeline import QueryProgress, ResultRecord, SearchHit
+from .preflight import preflight_offline
+from .proxies import ProxyPool, load_proxies
+from .ratelimit import RateLimitConfig, RateLimiter
+from .deepsearch import AdaptiveExpander, DeepSearchConfig, generate_variants
+from .retry import NETWORK, CircuitOpenError, RetryConfig, RetryPolicy, classify
+from .scheduler import QueryScheduler
+from .sessions import SessionStore
+from .sinks import BufferedSink, ResultSink, make_sink
+
+if TYPE_CHECKING:
+    from .sharding import SharedBudget
 
 
 logger = logging.getLogger(__name__)
 
+BUDGET_POLL = 0.05  # seconds between checks of a shared budget for returned slots
+
 
 class Parser:
-    def __init__(self, cfg: Config) -> None:
+    def __init__(
+        self,
+        cfg: Config,
+        client_factory: Optional[ClientFactory] = None,
+        accounts: Optional[Collection[str]] = None,
+        result_sink: Optional[ResultSink] = None,
+        budget: Optional[SharedBudget] = None,
+    ) -> None:
         self.cfg = cfg
+        self.client_factory = client_factory
+        self.result_sink = result_sink
+        # a shard: LIMIT is shared with the other shards and SEEN_DB is the collector's
+        self.budget = budget
         proxies = load_proxies(cfg.proxy_file)
-        self.acc_mgr = AccountManager(cfg.accounts_dir, cfg.dead_dir, proxies)
-
-        open(self.cfg.results_channels, "a", encoding="utf-8").close()
-        open(self.cfg.results_chats, "a", encoding="utf-8").close()
-
-    def run(self, queries: List[str]) -> None:
-        # expand queries if deep search is enabled
-        ds_cfg = DeepSearchConfig(
-            enabled=self.cfg.deep_search_enabled,
-            letters=self.cfg.deep_letters,
-            digits=self.cfg.deep_digits,
-            min_len_gate=self.cfg.deep_min_len_gate,
+        self.acc_mgr = AccountManager(
+            cfg.accounts_dir, cfg.dead_dir,
+            quarantine_base=cfg.account_quarantine, quarantine_cap=cfg.account_quarantine_cap,
+            include=accounts,
         )
-        expanded_queries: list[str] = []
-        for q in queries:
-            expanded_queries.extend(generate_variants(q, ds_cfg))
-        # dedupe keeping order
-        seen = set()
-        final_queries = [x for x in expanded_queries if not (x in seen or seen.add(x))]
-
-        remaining = self.cfg.limit
-        acc_idx = 0
+        self.proxy_pool = ProxyPool(
+            proxies,
+            probe_timeout=cfg.proxy_probe_timeout,
+            cooldown=cfg.proxy_cooldown,
+            max_failures=cfg.proxy_max_failures,
+        )
+        self.sessions = SessionStore(cfg.session_mode == "memory")
+        self.limiter = RateLimiter(RateLimitConfig(
+            account_rps=cfg.rate_account_rps,
+            account_burst=cfg.rate_account_burst,
+            count_rps=cfg.rate_count_rps,
+            count_burst=cfg.rate_count_burst,
+            proxy_rps=cfg.rate_proxy_rps,
+            proxy_burst=cfg.rate_proxy_burst,
+            min_rps=cfg.rate_min_rps,
+        ))
+        self.retry = RetryPolicy(RetryConfig(
+            network_attempts=cfg.retry_network_attempts,
+            transient_attempts=cfg.retry_transient_attempts,
+            base=cfg.base_backoff,
+            cap=cfg.backoff_cap,
+            breaker_threshold=cfg.breaker_threshold,
+            breaker_reset=cfg.breaker_reset,
+        ))
+
+        self.filter = EntityFilter(FilterConfig(
+            title_regex=cfg.filter_title_regex,
+            title_exclude_regex=cfg.filter_title_exclude_regex,
+            title_blocklist=cfg.filter_title_blocklist,
+            verified=cfg.filter_verified,
+            scam=cfg.filter_scam,
+            username=cfg.filter_username,
+            min_members=cfg.filter_min_members,
+            max_members=cfg.filter_max_members,
+        ))
+
+        self._remaining = 0
+        self._undecided = 0        # reserved hits whose member bounds wait for enrichment
+        self._budget_changed = asyncio.Event()
+        self._duplicates = 0
+        self.scheduler = QueryScheduler()
+        self.query_seen = SpillSet(capacity=1)
+        self.seen = SeenIndex(None)
+        self.count_cache = CountCache(None)
+        self.query_cache = QueryCache(None)
+        self._hits: asyncio.Queue[SearchHit] = asyncio.Queue()
+        self._records: asyncio.Queue[ResultRecord] = asyncio.Queue()
+        self._clients: dict[str, TelethonWrapper] = {}   # connected wrappers by session path
+        self._wrappers: list[TelethonWrapper] = []
+        self._count_stats: Counter[str] = Counter()
+        self._filter_stats: Counter[str] = Counter()
+        self.sink: Optional[BufferedSink] = None
+        self.journal = ProgressJournal(None)
+        self._progress: dict[str, QueryProgress] = {}
+        self._written_base = 0
+
+        self.ds_cfg = DeepSearchConfig(
+            enabled=cfg.deep_search_enabled,
+            letters=cfg.deep_letters,
+            digits=cfg.deep_digits,
+            min_len_gate=cfg.deep_min_len_gate,
+            adaptive=cfg.deep_adaptive,
+            max_depth=cfg.deep_max_depth,
+            min_new_ratio=cfg.deep_min_new_ratio,
+        )
+        self.expander: Optional[AdaptiveExpander] = None
 
-        while self.acc_mgr.has_next() and remaining > 0:
-            acc = self.acc_mgr.next_account()
-            if acc is None:
-                break
+    def _expand_queries(self, queries: Iterable[str]) -> Iterator[str]:
+        # expand queries lazily if deep search is enabled; the scheduler drops duplicates
+        for q in queries:
+            if self.expander is not None:
+                yield from self.expander.seeds(q)
+            else:
+                yield from generate_variants(q, self.ds_cfg)
+
+    def _query_source(self, queries: Iterable[str]) -> Iterator[tuple[str, float]]:
+        done = self.journal.state.done
+        # adaptive seeds have an unknown yield: rank them ahead of any child
+        seed_priority = -1.0 if self.expander is not None else 0.0
+        for q in self._expand_queries(queries):
+            if q not in done:
+                yield q, seed_priority
+
+    def _build_scheduler(self, queries: Iterable[str]) -> QueryScheduler:
+        done = self.journal.state.done
+        scheduler = QueryScheduler(max_attempts=self.cfg.query_max_attempts, seen=self.query_seen)
+        if self.expander is not None:
+            for parent, children in self.journal.state.expanded:
+                self.expander.register(parent, [c for c, _ in children])
+                for child, priority in children:
+                    if child not in done:
+                        scheduler.add(child, priority)
+        scheduler.feed(self._query_source(queries))
+        return scheduler
+
+    def run(self, queries: Iterable[str], resume: bool = False) -> None:
+        asyncio.run(self.run_async(queries, resume=resume))
+
+    async def warm_up(self) -> None:
+        """Probe proxies and preflight accounts (as configured), leaving good clients connected."""
+        if self.cfg.proxy_probe:
+            with tracing.span("proxy.probe", cat="proxy", proxies=len(self.proxy_pool)):
+                await self.proxy_pool.probe_all()
+        if self.cfg.preflight:
+            await self._preflight()
+
+    @property
+    def connected(self) -> int:
+        return len(self._clients)
+
+    async def close_clients(self) -> None:
+        for wrapper in self._clients.values():
+            await wrapper.disconnect()
+        self._clients = {}
+
+    async def run_async(self, queries: Iterable[str], resume: bool = False, keep_clients: bool = False) -> None:
+        """One run over ``queries``. With ``keep_clients`` the connected clients
+        are reused from (and left for) the surrounding service instead of being
+        set up by :meth:`warm_up` and disconnected at the end."""
+        if self.cfg.trace_file:
+            tracing.enable()
+        self.journal = ProgressJournal(self.cfg.journal_file, resume=resume)
+        self.expander = AdaptiveExpander(self.ds_cfg) if self.ds_cfg.adaptive else None
+        self.query_seen = SpillSet(capacity=self.cfg.query_dedup_capacity, memory_limit=self.cfg.query_dedup_memory)
+        self.scheduler = self._build_scheduler(queries)
+        self._progress = {}
+        self._written_base = self.journal.state.written
+        self._duplicates = 0
+        self.seen = SeenIndex(self.cfg.seen_db, readonly=self.budget is not None)
+        if self.budget is None:
+            self._remaining = self.cfg.limit - self._written_base
+            # results written before the interruption must not be written again
+            self.seen.remember(self.journal.state.written_ids)
+        else:
+            # a shard's results count once the collector writes them, and the
+            # collector's journal (not this one) records those
+            self._remaining = self.cfg.limit
+        self.count_cache = CountCache(
+            self.cfg.count_cache_db, ttl=self.cfg.count_cache_ttl, max_entries=self.cfg.count_cache_max,
+        )
+        self.query_cache = QueryCache(
+            self.cfg.query_cache_db, ttl=self.cfg.query_cache_ttl, max_entries=self.cfg.query_cache_max,
+            scope=self.cfg.search_type,
+            # cached access hashes only work for the account that received them
+            per_account=self.cfg.count_strategy != "skip",
+        )
 
-            proxy = self.acc_mgr.pick_proxy_for_index(acc_idx)
-            acc_idx += 1
+        # search workers -> hits -> enrich workers -> records -> sink; bounded queues give backpressure
+        self._hits = asyncio.Queue(maxsize=self.cfg.pipeline_queue_size)
+        self._records = asyncio.Queue(maxsize=self.cfg.pipeline_queue_size)
+        if keep_clients:
+            # the count summary covers this run only, and wrappers dropped earlier are gone
+            self._wrappers = list(self._clients.values())
+            for wrapper in self._wrappers:
+                wrapper.rpc_calls.clear()
+        else:
+            self._clients = {}
+            self._wrappers = []
+        self._count_stats = Counter()
+        self._filter_stats = Counter()
+        self._undecided = 0
+        self._budget_changed = asyncio.Event()
+        self.sink = make_sink(self.cfg, on_flush=self._on_flushed, sink=self.result_sink, on_drop=self._on_dropped)
+        stages = [asyncio.create_task(self._enrich_worker(), name=f"enrich-{i}") for i in range(self.cfg.enrich_workers)]
+        stages.append(asyncio.create_task(self._sink_worker(), name="sink"))
+        metrics_server = None
+        if self.cfg.metrics_port:
+            try:
+                metrics_server = metrics.serve_http(self.cfg.metrics_port, self.cfg.metrics_host)
+            except OSError as exc:
+                logger.error("Metrics endpoint unavailable on port %d: %s", self.cfg.metrics_port, exc)
+        if self.cfg.metrics_file:
+            stages.append(asyncio.create_task(metrics.snapshot_loop(self.cfg.metrics_file, self.cfg.metrics_interval)))
+
+        try:
+            if not keep_clients:
+                await self.warm_up()
+            workers = [
+                asyncio.create_task(self._account_worker(slot), name=f"account-worker-{slot}")
+                for slot in range(self.cfg.concurrency)
+            ]
+            await asyncio.gather(*workers)
+            await self._hits.join()
+            await self._records.join()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.sink.close()
+            self.journal.close()
+            if not keep_clients:
+                await self.close_clients()
+            self.sessions.checkpoint()
+            self.seen.close()
+            self.query_seen.close()
+            self.count_cache.close()
+            self.query_cache.close()
+            if self.cfg.metrics_file:
+                metrics.write_snapshot(self.cfg.metrics_file)
+            if metrics_server is not None:
+                metrics_server.shutdown()
+                metrics_server.server_close()
+            if self.cfg.trace_file:
+                tracing.export(self.cfg.trace_file)
+                tracing.disable()
+
+        self._log_count_summary()
+        if self._filter_stats:
+            logger.info(
+                "Filtered out %d results: %s", sum(self._filter_stats.values()),
+                ", ".join(f"{reason} {n}" for reason, n in self._filter_stats.most_common()),
+            )
+        logger.info(
+            "Count cache: %d hits, %d misses (%.0f%%)",
+            self.count_cache.hits, self.count_cache.misses, 100 * self.count_cache.hit_ratio,
+        )
+        logger.info(
+            "Query cache: %d hits, %d misses (%.0f%%)",
+            self.query_cache.hits, self.query_cache.misses, 100 * self.query_cache.hit_ratio,
+        )
 
-            meta = acc.meta or {}
-            api_id = meta.get("app_id", None)
-            api_hash = meta.get("app_hash", None)
+        logger.info(
+            "Queries: %d done, %d failed, %d left; %d duplicate results skipped",
+            self.scheduler.completed, self.scheduler.failed, self.scheduler.pending + self.scheduler.in_flight,
+            self._duplicates,
+        )
+        logger.info("Finished. %d results saved to %s.", self.sink.written, self.sink.target)
+
+    def _make_wrapper(self, acc: AccountMeta) -> Optional[TelethonWrapper]:
+        meta = acc.meta or {}
+        api_id = meta.get("app_id", None)
+        api_hash = meta.get("app_hash", None)
+
+        if api_id is None:
+            api_id = self.cfg.tg_api_id
+        if api_hash is None:
+            api_hash = self.cfg.tg_api_hash
+
+        try:
+            api_id = int(api_id) if api_id is not None else None
+        except Exception:  # noqa: BLE001
+            api_id = None
+
+        if not api_id or not api_hash:
+            logger.error("Missing api_id/api_hash for %s. Skipping.", acc.json_path or acc.session_path)
+            return None
+
+        wrapper = TelethonWrapper(
+            session_path=acc.session_path,
+            api_id=api_id,
+            api_hash=str(api_hash),
+            proxy_str=self.proxy_pool.assign(acc.session_path),
+            client_factory=self.client_factory,
+            limiter=self.limiter,
+            count_cache=self.count_cache,
+            query_cache=self.query_cache,
+            proxy_pool=self.proxy_pool,
+            dialog_refresh=self.cfg.dialog_refresh,
+            session_store=self.sessions,
+            retry=self.retry,
+        )
+        self._wrappers.append(wrapper)
+        return wrapper
 
-            if api_id is None:
-                api_id = self.cfg.tg_api_id
-            if api_hash is None:
-                api_hash = self.cfg.tg_api_hash
+    async def _start_wrapper(self, wrapper: TelethonWrapper) -> bool:
+        """Connect under the retry policy; auth errors propagate at once since retrying cannot help."""
 
+        async def attempt() -> None:
+            # sticky unless the previous attempt got the proxy evicted
+            wrapper.proxy_str = self.proxy_pool.assign(wrapper.session_path)
+            started = time.monotonic()
             try:
-                api_id = int(api_id) if api_id is not None else None
+                await wrapper.start()
             except Exception:  # noqa: BLE001
-                api_id = None
+                self.proxy_pool.report(wrapper.proxy_str, ok=False)
+                raise
+            self.proxy_pool.report(wrapper.proxy_str, latency=time.monotonic() - started)
+
+        try:
+            await self.retry.call(attempt, op="connect")
+            return True
+        except AUTH_ERRORS:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Start failed (%s): %s", classify(exc), exc)
+            return False
+
+    async def _preflight(self) -> None:
+        """Weed out unusable accounts before the first search: offline file
+        checks, then concurrent connects bounded by ``PREFLIGHT_TIMEOUT``.
+        Accounts that pass stay connected for the run."""
+        started = time.monotonic()
+        accounts = self.acc_mgr.usable()
+        with tracing.span("preflight.offline", cat="account", accounts=len(accounts)):
+            rejected = await preflight_offline(
+                accounts, self.cfg.tg_api_id, self.cfg.tg_api_hash, self.cfg.preflight_concurrency,
+            )
+        for acc in accounts:
+            reason = rejected.get(acc.session_path)
+            if reason is not None:
+                logger.error("Preflight: %s skipped: %s", acc.json_path or acc.session_path, reason)
+                self.acc_mgr.disable(acc)
+
+        sem = asyncio.Semaphore(self.cfg.preflight_concurrency)
+
+        async def probe(acc: AccountMeta) -> bool:
+            async with sem:
+                return await self._probe_account(acc)
+
+        candidates = [a for a in accounts if a.session_path not in rejected]
+        with tracing.span("preflight.connect", cat="account", accounts=len(candidates)):
+            ready = await asyncio.gather(*(probe(a) for a in candidates))
+        logger.info(
+            "Preflight: %d/%d accounts ready in %.1fs",
+            sum(ready), len(accounts), time.monotonic() - started,
+        )
 
-            if not api_id or not api_hash:
-                logger.error("Missing api_id/api_hash for %s. Skipping.", acc.json_path or acc.session_path)
-                continue
+    async def _probe_account(self, acc: AccountMeta) -> bool:
+        wrapper = self._make_wrapper(acc)
+        if wrapper is None:
+            self.acc_mgr.disable(acc)
+            return False
+        started = time.monotonic()
+        try:
+            authorized = await asyncio.wait_for(wrapper.connect(), self.cfg.preflight_timeout)
+        except AUTH_ERRORS as exc:
+            logger.error("Preflight: critical account error: %s. Moving to dead.", exc)
+            await self._discard_wrapper(wrapper)
+            self.acc_mgr.mark_dead(acc)
+            return False
+        except Exception as exc:  # noqa: BLE001
+            self.proxy_pool.report(wrapper.proxy_str, ok=False)
+            await self._discard_wrapper(wrapper)
+            # may be the proxy or the network: the account gets another chance later
+            self.acc_mgr.quarantine(acc, f"preflight connect failed: {exc!r}")
+            return False
+        if not authorized:
+            logger.error("Preflight: %s is not logged in, skipped", acc.json_path or acc.session_path)
+            await self._discard_wrapper(wrapper)
+            self.acc_mgr.disable(acc)
+            return False
+
+        latency = time.monotonic() - started
+        self.proxy_pool.report(wrapper.proxy_str, latency=latency)
+        self.acc_mgr.seed_latency(acc, latency)
+        self._clients[acc.session_path] = wrapper
+        return True
+
+    async def _discard_wrapper(self, wrapper: TelethonWrapper) -> None:
+        await wrapper.disconnect()
+        self.proxy_pool.release(wrapper.session_path)
+
+    def _left(self) -> int:
+        """LIMIT slots still free to reserve."""
+        if self.budget is not None:
+            return min(self._remaining, self.budget.remaining)
+        return self._remaining
+
+    def _undecided_hits(self) -> bool:
+        return bool(self._undecided) or (self.budget is not None and self.budget.pending)
+
+    def _reserve(self) -> bool:
+        if self._remaining <= 0 or (self.budget is not None and not self.budget.take()):
+            return False
+        self._remaining -= 1
+        return True
+
+    def _refund(self) -> None:
+        self._remaining += 1
+        if self.budget is not None:
+            self.budget.give_back()
+
+    def _stopping(self) -> bool:
+        return self.scheduler.finished or (self._left() <= 0 and not self._undecided_hits())
+
+    def _close_if_spent(self) -> None:
+        if self._left() <= 0 and not self._undecided_hits():
+            self.scheduler.close()
+
+    async def _wait_budget(self) -> None:
+        """LIMIT is reserved, but hits rejected after enrichment (or, in a
+        shard, by the collector) may hand slots back."""
+        # slots handed back by other processes do not set the event: poll
+        timeout = BUDGET_POLL if self.budget is not None else None
+        while self._left() <= 0 and self._undecided_hits():
+            if self.budget is not None:
+                # the collector cannot decide on records still buffered here
+                self.sink.flush()
+            self._budget_changed.clear()
+            try:
+                await asyncio.wait_for(self._budget_changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
 
-            wrapper = TelethonWrapper(
-                session_path=acc.session_path,
-                api_id=api_id,
-                api_hash=str(api_hash),
-                proxy_str=proxy,
-            )
+    async def _cool_down(self, seconds: float) -> None:
+        """Sleep ``seconds``, waking up early once the run has nothing left to do."""
+        deadline = time.monotonic() + seconds
+        while not self._stopping():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            await asyncio.sleep(min(1.0, left))
+
+    async def _drop_client(self, acc: AccountMeta) -> None:
+        """Disconnect ``acc`` now; its queued hits keep their search-payload counts."""
+        wrapper = self._clients.pop(acc.session_path, None)
+        if wrapper is not None:
+            await wrapper.disconnect()
+        self.proxy_pool.release(acc.session_path)
+
+    async def _connect(self, acc: AccountMeta) -> Optional[TelethonWrapper]:
+        """Connected wrapper for ``acc``; reuses the one from an earlier turn."""
+        wrapper = self._clients.get(acc.session_path)
+        if wrapper is not None:
+            return wrapper
+
+        wrapper = self._make_wrapper(acc)
+        if wrapper is None:
+            self.acc_mgr.disable(acc)
+            return None
+
+        try:
+            with tracing.span("account.start", cat="account", session=acc.session_path):
+                started = await self._start_wrapper(wrapper)
+        except AUTH_ERRORS as exc:
+            logger.error("Critical account error on start: %s. Moving to dead.", exc)
+            await wrapper.disconnect()
+            self.proxy_pool.release(acc.session_path)
+            self.acc_mgr.mark_dead(acc)
+            return None
+        if not started:
+            await wrapper.disconnect()
+            self.proxy_pool.release(acc.session_path)
+            self.acc_mgr.quarantine(acc, "could not start")
+            return None
+
+        self._clients[acc.session_path] = wrapper
+        return wrapper
+
+    async def _account_worker(self, slot: int) -> None:
+        while not self._stopping():
+            acc = await self.acc_mgr.acquire(should_stop=self._stopping)
+            if acc is None:
+                return
 
-            started = False
-            for attempt in range(5):
-                try:
-                    wrapper.start()
-                    started = True
-                    break
-                except Exception as exc:  # noqa: BLE001
-                    logger.error("Start failed: %s (attempt %d)", exc, attempt)
-                    smart_sleep(attempt, base=self.cfg.base_backoff, cap=self.cfg.backoff_cap)
-
-            if not started:
-                logger.error("Could not start account. Marking dead.")
-                self.acc_mgr.mark_dead(acc)
+            wrapper = await self._connect(acc)
+            if wrapper is None:
                 continue
 
+            logger.debug("Worker %d uses %s", slot, acc.session_path)
             try:
-                for query in final_queries:
-                    if remaining <= 0:
-                        break
-
-                    per_call = min(20, remaining)
-                    logger.info("Searching '%s' (limit %d)", query, per_call)
-
-                    results = None
-                    for attempt in range(6):
-                        try:
-                            results = wrapper.search_public(query, limit=per_call)
-                            break
-                        except errors.FloodWaitError as e:
-                            logger.warning("FloodWait: sleeping %ds", e.seconds)
-                            time.sleep(e.seconds + 1)
-                        except Exception as exc:  # noqa: BLE001
-                            logger.error("Search error: %s (attempt %d)", exc, attempt)
-                            smart_sleep(attempt, base=self.cfg.base_backoff, cap=self.cfg.backoff_cap)
-
-                    if results is None:
-                        results = []
-
-                    for ent in results:
-                        if remaining <= 0:
-                            break
-
-                        is_channel = isinstance(ent, types.Channel) and bool(getattr(ent, "broadcast", False))
-                        is_chat = isinstance(ent, types.Chat) or (isinstance(ent, types.Channel) and bool(getattr(ent, "megagroup", False)))
-
-                        if self.cfg.search_type == "channel" and not is_channel:
-                            continue
-                        if self.cfg.search_type == "chat" and not is_chat:
-                            continue
-
-                        title = getattr(ent, "title", None) or getattr(ent, "name", None) or "NO_TITLE"
-                        count = wrapper.get_participants_count(ent) or 0
-                        link = wrapper.get_link(ent) or "NO_LINK"
-
-                        line = f"{title} | {count} | {link}"
-                        target_file = self.cfg.results_channels if is_channel else self.cfg.results_chats
-                        with open(target_file, "a", encoding="utf-8") as f:
-                            f.write(line + "\n")
-
-                        remaining -= 1
-
-                    smart_sleep(0, base=self.cfg.base_backoff, cap=self.cfg.backoff_cap)
-
-            except (errors.SessionPasswordNeededError, errors.AuthKeyError, errors.PhoneNumberInvalidError) as exc:
+                cooldown = await self._search_with(wrapper, acc)
+            except AUTH_ERRORS as exc:
                 logger.error("Critical account error: %s. Moving to dead.", exc)
-                try:
-                    wrapper.disconnect()
-                except Exception:  # noqa: BLE001
-                    pass
+                await self._drop_client(acc)
                 self.acc_mgr.mark_dead(acc)
                 continue
             except Exception as exc:  # noqa: BLE001
                 logger.exception("Unhandled error with account: %s", exc)
-                try:
-                    wrapper.disconnect()
-                except Exception:  # noqa: BLE001
-                    pass
+                await self._drop_client(acc)
+                self.acc_mgr.quarantine(acc, exc)
                 continue
 
+            # the client stays connected: pending hits still need it and the
+            # account may come back after its cool-down
+            self.acc_mgr.release(acc, cooldown=cooldown)
+
+    async def _search_query(self, wrapper: TelethonWrapper, acc: AccountMeta, query: str, limit: int) -> Optional[list]:
+        """Search ``query``; None means it was handed back to the scheduler.
+
+        Retries already happened in the client's retry policy. Network errors
+        propagate so the worker drops the connection and quarantines the
+        account; anything else hands the query back to the scheduler.
+        """
+        started = time.monotonic()
+        try:
+            with tracing.span("search", cat="search", query=query):
+                results = await wrapper.search_public(query, limit=limit)
+        except errors.FloodWaitError as e:
+            # the limiter already put this account on cool-down
+            logger.warning("FloodWait %ds, '%s' returned to queue", e.seconds, query)
+            self.acc_mgr.record_flood(acc, e.seconds)
+            self.scheduler.requeue(query)
+            return None
+        except AUTH_ERRORS:
+            raise
+        except CircuitOpenError as exc:
+            if classify(exc) == NETWORK:
+                raise
+            logger.warning("%s, '%s' returned to queue", exc, query)
+            self.scheduler.requeue(query, delay=max(1.0, exc.retry_in))
+            return None
+        except Exception as exc:  # noqa: BLE001
+            kind = classify(exc)
+            if kind == NETWORK:
+                raise
+            logger.error("Search error (%s) for '%s': %s", kind, query, exc)
+            self.acc_mgr.record_failure(acc)
+            self.scheduler.requeue(query, failed=True)
+            return None
+        self.acc_mgr.record_success(acc, time.monotonic() - started)
+        return results
+
+    async def _search_with(self, wrapper: TelethonWrapper, acc: AccountMeta) -> float:
+        """Work through the queue with one account.
+
+        Returns the cool-down to put the account on: a long FloodWait hands it
+        back to the pool so the worker can continue with another account.
+        """
+        while not self._stopping():
+            if self._left() <= 0:
+                await self._wait_budget()
+                continue
+            cooldown = self.limiter.cooldown(wrapper.session_path)
+            if cooldown > self.cfg.flood_switch_seconds:
+                return cooldown
+            if cooldown > 0:
+                # do not hold a query while this account is cooling down
+                await self._cool_down(cooldown)
+                continue
+
+            query = await self.scheduler.get()
+            if query is None:
+                break
+
             try:
-                wrapper.disconnect()
-            except Exception:  # noqa: BLE001
-                pass
+                await self._process_query(wrapper, acc, query)
+            except BaseException:
+                # the account died or the run was cancelled: let another worker take it
+                self.scheduler.requeue(query)
+                raise
+
+            self._close_if_spent()
+        return 0.0
+
+    async def _process_query(self, wrapper: TelethonWrapper, acc: AccountMeta, query: str) -> None:
+        # a requeued or resumed query continues after the results it already consumed
+        progress = self._progress.get(query)
+        if progress is None:
+            progress = QueryProgress(cursor=self.journal.state.cursors.get(query, 0))
+            self._progress[query] = progress
+
+        # with filters on, part of the page is dropped anyway: always ask for a full one
+        per_call = 20 if self.filter.active else min(20, self._left() + progress.cursor)
+        logger.info("Searching '%s' (limit %d)", query, per_call)
+
+        results = await self._search_query(wrapper, acc, query, per_call)
+        if results is None:
+            return
+
+        new = 0
+        for idx, ent in enumerate(results):
+            if idx < progress.cursor:
+                continue
+            if self._left() <= 0:
+                await self._wait_budget()
+            if self._left() <= 0:
+                progress.partial = True
+                break
+            progress.cursor = idx + 1
 
-        logger.info("Finished. Results saved to '%s' and '%s'.", self.cfg.results_channels, self.cfg.results_chats)
+            is_channel = isinstance(ent, types.Channel) and bool(getattr(ent, "broadcast", False))
+            is_chat = isinstance(ent, types.Chat) or (isinstance(ent, types.Channel) and bool(getattr(ent, "megagroup", False)))
+
+            if self.cfg.search_type == "channel" and not is_channel:
+                continue
+            if self.cfg.search_type == "chat" and not is_chat:
+                continue
+
+            # checked before any enrichment RPC: filtered entities and duplicates cost nothing
+            count = payload_count(ent)
+            if count is None and self.cfg.count_strategy == "skip":
+                count = 0
+            reason = self.filter.check(ent, count)
+            if reason is not None:
+                self._filtered(reason, "payload")
+                continue
+            # reserve the slot before awaiting so concurrent workers cannot overshoot LIMIT
+            if not self._reserve():
+                # another shard took the last slot: resume from this result
+                progress.cursor = idx
+                progress.partial = True
+                break
+            if not self.seen.add(entity_key(ent)):
+                self._refund()
+                self._duplicates += 1
+                continue
+            new += 1
+            progress.outstanding += 1
+            recheck = self.filter.has_member_bounds and (count is None or self.cfg.count_strategy == "exact")
+            if recheck:
+                self._undecided += 1
+            await self._hits.put(SearchHit(ent, query, "channel" if is_channel else "chat", wrapper, recheck))
+
+        account = metrics.account_label(acc.session_path)
+        metrics.inc("tgparser_account_results_total", len(results), account=account)
+        metrics.inc("tgparser_account_unique_results_total", new, account=account)
+        metrics.inc("tgparser_query_results_total", len(results), query=query)
+        metrics.inc("tgparser_query_unique_results_total", new, query=query)
+
+        if self.expander is not None and not progress.partial:
+            children = self.expander.feedback(query, len(results), per_call, new)
+            if children:
+                for child, priority in children:
+                    self.scheduler.add(child, priority)
+                self.journal.mark_expanded(query, children)
+
+        progress.finished = True
+        self.scheduler.done(query)
+        self._settle(query)
+
+    def _settle(self, query: str, written: int = 0) -> None:
+        """Account for ``written`` finished hits of ``query``; journal it once complete."""
+        progress = self._progress.get(query)
+        if progress is None:
+            return
+        progress.outstanding -= written
+        if not progress.finished or progress.outstanding > 0:
+            return
+        del self._progress[query]
+        total = self._written_base + self.sink.written
+        if progress.partial:
+            self.journal.mark_partial(query, progress.cursor, total)
+        else:
+            self.journal.mark_done(query, total)
+
+    def _on_flushed(self, batch: list[ResultRecord]) -> None:
+        ids = [rec.peer_id for rec in batch if rec.peer_id is not None]
+        self.seen.persist(ids)
+        if self.budget is None:
+            self.journal.mark_written(ids, self._written_base + self.sink.written)
+        for query, n in Counter(rec.query for rec in batch).items():
+            self._settle(query, n)
+
+    def _on_dropped(self, batch: list[ResultRecord]) -> None:
+        # never written: another query may still deliver these entities
+        for rec in batch:
+            self.seen.release(rec.peer_id)
+
+    async def _enrich_worker(self) -> None:
+        while True:
+            hit = await self._hits.get()
+            try:
+                ent = hit.entity
+                title = getattr(ent, "title", None) or getattr(ent, "name", None) or "NO_TITLE"
+                with tracing.span("enrich", cat="count", query=hit.query):
+                    count = await self._resolve_count(hit)
+                if hit.recheck:
+                    reason = self.filter.check_members(count)
+                    if reason is not None:
+                        # give the LIMIT slot back before waiting workers re-check the budget
+                        self._filtered(reason, "enriched")
+                        self.seen.release(entity_key(ent))
+                        self._refund()
+                        self._settle(hit.query, 1)
+                        continue
+                link = hit.wrapper.get_link(ent) or "NO_LINK"
+                await self._records.put(ResultRecord(title, count, link, hit.kind, hit.query, entity_key(ent)))
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Enrichment failed for '%s': %s", hit.query, exc)
+                # nothing was written for it: the slot and the entity are free again
+                self.seen.release(entity_key(hit.entity))
+                self._refund()
+                self._settle(hit.query, 1)
+            finally:
+                if hit.recheck:
+                    self._undecided -= 1
+                    self._budget_changed.set()
+                    self._close_if_spent()
+                self._hits.task_done()
+
+    def _filtered(self, reason: str, stage: str) -> None:
+        self._filter_stats[reason] += 1
+        metrics.inc("tgparser_filtered_total", reason=reason, stage=stage)
+
+    async def _resolve_count(self, hit: SearchHit) -> int:
+        """exact: always ask Telegram; fast: trust the search payload when it has a
+        count; skip: never spend an RPC on counts."""
+        strategy = self.cfg.count_strategy
+        if strategy in ("fast", "skip"):
+            count = payload_count(hit.entity)
+            if count is not None:
+                self._count_stats["payload"] += 1
+                return int(count)
+            if strategy == "skip":
+                self._count_stats["skipped"] += 1
+                return 0
+        self._count_stats["lookup"] += 1
+        return await hit.wrapper.get_participants_count(hit.entity) or 0
+
+    def _log_count_summary(self) -> None:
+        stats = self._count_stats
+        rpcs = sum(w.rpc_calls[name] for w in self._wrappers for name in COUNT_REQUESTS)
+        # every entity that bypassed the lookup would have cost at least one RPC in exact mode
+        per_lookup = max(1.0, rpcs / stats["lookup"]) if stats["lookup"] else 1.0
+        saved = (stats["payload"] + stats["skipped"]) * per_lookup
+        logger.info(
+            "Counts (%s): %d from search payload, %d looked up (%d RPCs), %d skipped; ~%d RPCs saved",
+            self.cfg.count_strategy, stats["payload"], stats["lookup"], rpcs, stats["skipped"], saved,
+        )
+
+    async def _sink_worker(self) -> None:
+        while True:
+            try:
+                rec = await asyncio.wait_for(self._records.get(), self.sink.time_to_flush())
+            except asyncio.TimeoutError:
+                self.sink.flush()
+                continue
+            try:
+                self.sink.add(rec)
+            finally:
+                self._records.task_done()
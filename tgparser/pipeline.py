@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .client import TelethonWrapper
+
+
+@dataclass
+class SearchHit:
+    """Search result waiting for enrichment; bound to the account that found it
+    because channel access hashes are per account."""
+    entity: Any
+    query: str
+    kind: str                  # "channel" | "chat"
+    wrapper: TelethonWrapper
+    recheck: bool = False      # member bounds still to be checked on the enriched count
+
+
+@dataclass
+class ResultRecord:
+    title: str
+    count: int
+    link: str
+    kind: str
+    query: str
+    peer_id: Optional[int] = None
+
+
+@dataclass
+class QueryProgress:
+    """Bookkeeping for the journal: a query is complete once its search is
+    finished and none of its hits are still travelling through the pipeline."""
+    cursor: int = 0            # results consumed from the search response
+    outstanding: int = 0       # hits emitted but not yet written
+    finished: bool = False
+    partial: bool = False      # stopped early because LIMIT was reached
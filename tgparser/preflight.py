@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+from .accounts import AccountMeta
+from .sessions import read_session, session_file
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_offline(acc: AccountMeta, api_id: Optional[int] = None, api_hash: Optional[str] = None) -> Optional[str]:
+    """Why ``acc`` cannot work, judged from its files alone; None if it looks usable.
+
+    Catches what would otherwise surface only after ``start()`` retries (or an
+    interactive login prompt) in the middle of a run: an unreadable JSON,
+    missing app credentials, a missing or corrupt session, no auth key.
+    """
+    meta = acc.meta or {}
+    if acc.json_path:
+        try:
+            with open(acc.json_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as exc:  # noqa: BLE001
+            return f"account JSON unreadable: {exc}"
+        if not isinstance(meta, dict):
+            return "account JSON is not an object"
+    # same fallback as Parser._make_wrapper: a null in the JSON means "use .env"
+    app_id = meta.get("app_id")
+    app_hash = meta.get("app_hash")
+    if app_id is None:
+        app_id = api_id
+    if app_hash is None:
+        app_hash = api_hash
+    try:
+        app_id = int(app_id) if app_id is not None else None
+    except (TypeError, ValueError):
+        return f"invalid app_id {app_id!r}"
+    if not app_id or not app_hash:
+        return "no app_id/app_hash in JSON or .env"
+
+    file = session_file(acc.session_path)
+    if not os.path.exists(file):
+        return f"session file {file} not found"
+    try:
+        state = read_session(file)
+    except Exception as exc:  # noqa: BLE001
+        return f"session {file} unreadable: {exc}"
+    if state is None or not state[3]:
+        return f"session {file} has no auth key (not logged in)"
+    return None
+
+
+async def preflight_offline(accounts: Iterable[AccountMeta], api_id: Optional[int] = None,
+                            api_hash: Optional[str] = None, concurrency: int = 16) -> dict[str, str]:
+    """Run :func:`check_offline` for all ``accounts`` in worker threads.
+
+    Returns the rejected accounts as ``{session_path: reason}``.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    rejected: dict[str, str] = {}
+
+    async def check(acc: AccountMeta) -> None:
+        async with sem:
+            reason = await asyncio.to_thread(check_offline, acc, api_id, api_hash)
+        if reason is not None:
+            rejected[acc.session_path] = reason
+
+    await asyncio.gather(*(check(acc) for acc in accounts))
+    return rejected
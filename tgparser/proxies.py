@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import math
 import os
+import time
+from dataclasses import dataclass
 from typing import Optional, Tuple
 from urllib.parse import urlparse
 import socks
 
 
+logger = logging.getLogger(__name__)
+
+
 def load_proxies(path: str) -> list[str]:
     if not os.path.exists(path):
         return []
@@ -45,3 +53,131 @@ def parse_proxy(proxy_str: str) -> Optional[Tuple[int, str, int, bool, str | Non
         return (ptype, host, port, True, username, password)
     except Exception:
         return None
+
+
+@dataclass
+class ProxyStats:
+    proxy: str
+    latency: float = math.inf      # EWMA of connect/RPC latency, seconds
+    failures: int = 0              # consecutive failures
+    evicted_until: float = 0.0
+    accounts: int = 0              # accounts currently assigned
+
+
+class ProxyPool:
+    """Latency-ranked, self-healing proxy pool.
+
+    :meth:`probe_all` connects through every proxy to a Telegram DC in
+    parallel and ranks them by connect time; live RPC timings reported via
+    :meth:`report` keep re-scoring them. A proxy that fails ``max_failures``
+    times in a row is evicted for ``cooldown`` seconds. Accounts get a sticky
+    proxy from :meth:`assign` and only move when theirs is evicted.
+    """
+
+    def __init__(self, proxies: list[str], probe_target: str = "149.154.167.51:443",
+                 probe_timeout: float = 5.0, cooldown: float = 300.0, max_failures: int = 3,
+                 probe_concurrency: int = 32, alpha: float = 0.3) -> None:
+        self.probe_target = probe_target
+        self.probe_timeout = probe_timeout
+        self.cooldown = cooldown
+        self.max_failures = max(1, max_failures)
+        self.probe_concurrency = max(1, probe_concurrency)
+        self.alpha = alpha
+        self._stats: dict[str, ProxyStats] = {p: ProxyStats(p) for p in proxies}
+        self._assigned: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def _probe_blocking(self, proxy: str) -> float:
+        parsed = parse_proxy(proxy)
+        if parsed is None:
+            raise ValueError(f"unparsable proxy: {proxy}")
+        ptype, host, port, rdns, username, password = parsed
+        dest_host, _, dest_port = self.probe_target.rpartition(":")
+        started = time.monotonic()
+        sock = socks.create_connection(
+            (dest_host, int(dest_port)), timeout=self.probe_timeout,
+            proxy_type=ptype, proxy_addr=host, proxy_port=port, proxy_rdns=rdns,
+            proxy_username=username, proxy_password=password,
+        )
+        sock.close()
+        return time.monotonic() - started
+
+    async def probe_all(self) -> None:
+        if not self._stats:
+            return
+        sem = asyncio.Semaphore(self.probe_concurrency)
+
+        async def probe(stats: ProxyStats) -> None:
+            async with sem:
+                try:
+                    latency = await asyncio.to_thread(self._probe_blocking, stats.proxy)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Proxy probe failed for %s: %s", stats.proxy, exc)
+                    self._evict(stats)
+                    return
+                stats.latency = latency
+                stats.failures = 0
+                stats.evicted_until = 0.0
+
+        await asyncio.gather(*(probe(s) for s in self._stats.values()))
+        healthy = sum(1 for s in self._stats.values() if s.evicted_until == 0.0)
+        logger.info("Proxy probe: %d/%d healthy", healthy, len(self._stats))
+
+    def _evict(self, stats: ProxyStats) -> None:
+        stats.failures = 0
+        stats.evicted_until = time.monotonic() + self.cooldown
+        stats.latency = math.inf
+        logger.warning("Proxy evicted for %ds: %s", int(self.cooldown), stats.proxy)
+
+    def _healthy(self, stats: ProxyStats, now: float) -> bool:
+        return stats.evicted_until <= now
+
+    def _score(self, stats: ProxyStats) -> float:
+        # spread accounts: each extra account on a proxy costs like a slower link
+        latency = stats.latency if stats.latency != math.inf else self.probe_timeout
+        return latency * (1 + stats.accounts)
+
+    def assign(self, account: str) -> Optional[str]:
+        """Sticky healthy proxy for ``account``; None when no proxies are configured."""
+        if not self._stats:
+            return None
+        now = time.monotonic()
+        current = self._assigned.get(account)
+        if current is not None:
+            stats = self._stats[current]
+            if self._healthy(stats, now):
+                return current
+            self.release(account)
+
+        healthy = [s for s in self._stats.values() if self._healthy(s, now)]
+        if healthy:
+            best = min(healthy, key=self._score)
+        else:
+            # everything is cooling down: take the one that comes back first
+            best = min(self._stats.values(), key=lambda s: s.evicted_until)
+        best.accounts += 1
+        self._assigned[account] = best.proxy
+        return best.proxy
+
+    def release(self, account: str) -> None:
+        proxy = self._assigned.pop(account, None)
+        if proxy is not None:
+            self._stats[proxy].accounts = max(0, self._stats[proxy].accounts - 1)
+
+    def report(self, proxy: Optional[str], latency: Optional[float] = None, ok: bool = True) -> None:
+        stats = self._stats.get(proxy) if proxy else None
+        if stats is None:
+            return
+        if not ok:
+            stats.failures += 1
+            if stats.failures >= self.max_failures:
+                self._evict(stats)
+            return
+        stats.failures = 0
+        if latency is not None:
+            if stats.latency == math.inf:
+                stats.latency = latency
+            else:
+                stats.latency = self.alpha * latency + (1 - self.alpha) * stats.latency
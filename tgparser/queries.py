@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import os
+from typing import Iterator
+
+
+def iter_queries(path: str) -> Iterator[str]:
+    """Non-empty, stripped lines of ``path``, read lazily."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH = "search"    # searches and any other RPC
+COUNT = "count"      # member-count lookups during enrichment
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    account_rps: float = 1.0
+    account_burst: float = 3.0
+    count_rps: float = 5.0
+    count_burst: float = 10.0
+    proxy_rps: float = 10.0
+    proxy_burst: float = 20.0
+    min_rps: float = 0.05
+    increase: float = 0.05     # share of the ceiling regained per successful RPC
+    decrease: float = 0.5      # rate multiplier applied on a FloodWait of flood_scale seconds
+    flood_scale: float = 30.0  # shorter waits lower the rate less, longer ones more
+
+
+class TokenBucket:
+    """Token bucket with an AIMD-adjusted rate.
+
+    ``max_rate`` is the configured ceiling. A FloodWait blocks the bucket for
+    the requested seconds and cuts the rate in proportion to that wait (a
+    1-second wait barely, a minute-long one by a factor of four with the
+    defaults); every success gives back a fixed share of the ceiling, so
+    recovery takes as many RPCs for a 0.5 rps account as for a 20 rps proxy.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float) -> None:
+        self.max_rate = max(rate, min_rate)
+        self.rate = self.max_rate
+        self.min_rate = min_rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token can be taken."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1.0:
+            wait = max(wait, (1.0 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def on_success(self, increase: float) -> None:
+        self.rate = min(self.max_rate, self.rate + increase * self.max_rate)
+
+    def on_flood_wait(self, seconds: float, decrease: float, scale: float, now: float, block: bool = True) -> None:
+        factor = decrease ** (max(0.0, seconds) / scale) if scale > 0 else decrease
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.tokens = min(self.tokens, 0.0)
+        if block:
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimiter:
+    """Per-account and per-proxy token buckets shared by all workers.
+
+    Every account has two buckets, one for searches (``op`` :data:`SEARCH`)
+    and one for member-count lookups (:data:`COUNT`), so enrichment is not
+    held to the search rate. A FloodWait blocks only the bucket of the kind
+    of request that received it, and it slows the proxy without blocking it.
+
+    :meth:`acquire` suspends the calling task until the buckets allow the
+    RPC, and it waits out a FloodWait block. Callers that serve several
+    accounts must not call it for an account that is cooling down; check
+    :meth:`cooldown` first, as the search workers and the count lookups do.
+    """
+
+    def __init__(self, cfg: RateLimitConfig | None = None) -> None:
+        self.cfg = cfg or RateLimitConfig()
+        self._accounts: dict[str, TokenBucket] = {}
+        self._counts: dict[str, TokenBucket] = {}
+        self._proxies: dict[str, TokenBucket] = {}
+
+    def _account(self, key: str, op: str = SEARCH) -> TokenBucket:
+        if op == COUNT:
+            buckets, rps, burst = self._counts, self.cfg.count_rps, self.cfg.count_burst
+        else:
+            buckets, rps, burst = self._accounts, self.cfg.account_rps, self.cfg.account_burst
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rps, burst, self.cfg.min_rps)
+            buckets[key] = bucket
+        return bucket
+
+    def _proxy(self, key: Optional[str]) -> Optional[TokenBucket]:
+        if not key:
+            return None
+        bucket = self._proxies.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.cfg.proxy_rps, self.cfg.proxy_burst, self.cfg.min_rps)
+            self._proxies[key] = bucket
+        return bucket
+
+    def _buckets(self, account: str, proxy: Optional[str], op: str) -> list[TokenBucket]:
+        buckets = [self._account(account, op)]
+        pb = self._proxy(proxy)
+        if pb is not None:
+            buckets.append(pb)
+        return buckets
+
+    async def acquire(self, account: str, proxy: Optional[str] = None, op: str = SEARCH) -> None:
+        buckets = self._buckets(account, proxy, op)
+        while True:
+            now = time.monotonic()
+            wait = max(b.delay(now) for b in buckets)
+            if wait <= 0:
+                for b in buckets:
+                    b.take(now)
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self, account: str, proxy: Optional[str] = None, op: str = SEARCH) -> None:
+        for b in self._buckets(account, proxy, op):
+            b.on_success(self.cfg.increase)
+
+    def on_flood_wait(self, account: str, proxy: Optional[str], seconds: float, op: str = SEARCH) -> None:
+        now = time.monotonic()
+        acc = self._account(account, op)
+        acc.on_flood_wait(seconds, self.cfg.decrease, self.cfg.flood_scale, now)
+        # FloodWait is bound to the account; the proxy only slows down a bit
+        pb = self._proxy(proxy)
+        if pb is not None:
+            pb.on_flood_wait(seconds, self.cfg.decrease, self.cfg.flood_scale, now, block=False)
+        logger.info("Rate of %s for %s lowered to %.3f rps, cooling down %ds", op, account, acc.rate, seconds)
+
+    def cooldown(self, account: str, op: str = SEARCH) -> float:
+        """Seconds left before ``account`` may issue ``op`` RPCs again."""
+        bucket = (self._counts if op == COUNT else self._accounts).get(account)
+        if bucket is None:
+            return 0.0
+        return max(0.0, bucket.blocked_until - time.monotonic())
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from telethon import errors
+
+from . import metrics
+from .backoff import smart_sleep_async
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# errors after which an account will never work again
+AUTH_ERRORS = (
+    errors.UnauthorizedError,
+    errors.AuthKeyError,
+    errors.PhoneNumberBannedError,
+    errors.PhoneNumberInvalidError,
+)
+
+FLOOD = "flood"          # FloodWait: the caller cools the account down, never retried here
+NETWORK = "network"      # connection/proxy trouble
+TRANSIENT = "transient"  # Telegram-side 5xx / timeouts
+FATAL = "fatal"          # the account is unusable
+PERMANENT = "permanent"  # retrying the same request cannot help (4xx, bugs)
+
+
+class CircuitOpenError(Exception):
+    """A breaker refused the call without trying it."""
+
+    def __init__(self, key: str, retry_in: float) -> None:
+        super().__init__(f"circuit {key} open, retry in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class ClientClosedError(Exception):
+    """The call ran on a client this process had already disconnected."""
+
+
+def classify(exc: BaseException) -> str:
+    if isinstance(exc, errors.FloodError):
+        return FLOOD
+    if isinstance(exc, AUTH_ERRORS):
+        return FATAL
+    if isinstance(exc, CircuitOpenError):
+        return NETWORK if exc.key.startswith("proxy:") else PERMANENT
+    if isinstance(exc, ClientClosedError):
+        return PERMANENT
+    if isinstance(exc, (errors.ServerError, errors.TimedOutError)):
+        return TRANSIENT
+    if isinstance(exc, errors.RPCError):
+        return PERMANENT
+    if isinstance(exc, (ConnectionError, OSError, asyncio.TimeoutError)):
+        return NETWORK
+    return PERMANENT
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; after ``reset_after``
+    seconds a single trial call is let through (half-open) and its outcome
+    closes or re-opens the circuit."""
+
+    def __init__(self, key: str, threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.key = key
+        self.threshold = max(1, threshold)
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    def check(self) -> None:
+        """Raise :class:`CircuitOpenError` unless a call may go through now."""
+        if self.opened_at is None:
+            return
+        left = self.opened_at + self.reset_after - time.monotonic()
+        if left > 0 or self._trial:
+            raise CircuitOpenError(self.key, max(0.0, left))
+
+    def claim(self) -> bool:
+        """After a successful :meth:`check`: take the half-open trial if the
+        circuit is open. A claimed trial must end in :meth:`success`,
+        :meth:`failure` or :meth:`release`."""
+        if self.opened_at is None:
+            return False
+        self._trial = True
+        return True
+
+    def release(self) -> None:
+        """Give back a trial whose call ended without an outcome (e.g. cancelled)."""
+        self._trial = False
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Circuit %s closed", self.key)
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+            if not self._trial:
+                logger.warning("Circuit %s opened after %d failures", self.key, self.failures)
+                metrics.inc("tgparser_circuit_open_total", breaker=self.key)
+            self.opened_at = time.monotonic()
+            self._trial = False
+
+
+@dataclass(frozen=True)
+class RetryConfig:
+    network_attempts: int = 3
+    transient_attempts: int = 3
+    base: float = 1.0
+    cap: float = 60.0
+    breaker_threshold: int = 5
+    breaker_reset: float = 30.0
+
+
+class RetryPolicy:
+    """Retries shared by every client: errors are classified once, each class
+    has its own attempt budget (jittered exponential backoff, async sleeps),
+    and breakers per proxy and per RPC type fail calls fast while something is
+    clearly down. FloodWait, auth and permanent errors are raised at once."""
+
+    def __init__(self, cfg: RetryConfig | None = None) -> None:
+        self.cfg = cfg or RetryConfig()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        br = self._breakers.get(key)
+        if br is None:
+            br = self._breakers[key] = CircuitBreaker(key, self.cfg.breaker_threshold, self.cfg.breaker_reset)
+        return br
+
+    def _budget(self, kind: str) -> int:
+        if kind == NETWORK:
+            return self.cfg.network_attempts
+        if kind == TRANSIENT:
+            return self.cfg.transient_attempts
+        return 1
+
+    async def call(self, fn: Callable[[], Awaitable[T]], op: str, proxy: Optional[str] = None) -> T:
+        """Run ``fn`` under the policy; ``op`` names the RPC type for its breaker."""
+        op_breaker = self.breaker(f"rpc:{op}")
+        proxy_breaker = self.breaker(f"proxy:{metrics.proxy_label(proxy)}") if proxy else None
+        breakers = [br for br in (proxy_breaker, op_breaker) if br is not None]
+        attempts: Counter[str] = Counter()
+        while True:
+            # check every breaker before claiming any trial, so none is lost
+            for br in breakers:
+                br.check()
+            trials = [br for br in breakers if br.claim()]
+            try:
+                result = await fn()
+            except Exception as exc:  # noqa: BLE001
+                error = exc
+                kind = classify(exc)
+                if isinstance(exc, ClientClosedError):
+                    pass  # our own disconnect says nothing about the route or the RPC type
+                elif kind == NETWORK:
+                    if proxy_breaker is not None:
+                        proxy_breaker.failure()
+                elif kind == TRANSIENT:
+                    op_breaker.failure()
+                else:
+                    # Telegram answered (4xx, FloodWait): route and RPC type are up
+                    self._succeeded(proxy_breaker, op_breaker)
+            else:
+                self._succeeded(proxy_breaker, op_breaker)
+                return result
+            finally:
+                # a trial that got no outcome (cancelled, or the other breaker's
+                # error) must not keep the circuit open for good
+                for br in trials:
+                    br.release()
+            attempts[kind] += 1
+            if attempts[kind] >= self._budget(kind):
+                raise error
+            metrics.inc("tgparser_retries_total", op=op, error_class=kind)
+            logger.debug("%s failed (%s, attempt %d): %s", op, kind, attempts[kind], error)
+            await smart_sleep_async(attempts[kind] - 1, base=self.cfg.base, cap=self.cfg.cap)
+
+    @staticmethod
+    def _succeeded(proxy_breaker: Optional[CircuitBreaker], op_breaker: CircuitBreaker) -> None:
+        if proxy_breaker is not None:
+            proxy_breaker.success()
+        op_breaker.success()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Iterable, Iterator, Optional
+
+from .dedup import SpillSet
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryScheduler:
+    """Central work queue shared by all account workers.
+
+    Every query is handed out exactly once; a worker that could not finish a
+    query (FloodWait, dead account, a search error) gives it back with
+    :meth:`requeue` and any idle worker picks it up. Lower ``priority`` values
+    are served first, ties keep insertion order.
+
+    Queries can also be pulled lazily from a :meth:`feed` source, so only a
+    window of ``batch`` queries is held in memory; ``seen`` (a bounded
+    :class:`SpillSet` for huge inputs) remembers every query ever added.
+    """
+
+    def __init__(self, queries: Iterable[str] = (), max_attempts: int = 3,
+                 seen: Optional[SpillSet] = None) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._seen = seen
+        self._seen_mem: set[str] = set()
+        self._attempts: dict[str, int] = {}
+        self._in_flight: dict[str, float] = {}   # query -> priority
+        self._delayed: dict[str, float] = {}     # requeued with a delay: query -> priority
+        self._source: Optional[Iterator[tuple[str, float]]] = None
+        self._batch = 0
+        self._wakeup = asyncio.Event()
+        self._closed = False
+
+        self.completed = 0
+        self.failed = 0
+
+        for q in queries:
+            self.add(q)
+
+    def _push(self, query: str, priority: float) -> None:
+        heapq.heappush(self._heap, (priority, next(self._seq), query))
+        self._wakeup.set()
+
+    def _first_time(self, query: str) -> bool:
+        if self._seen is not None:
+            return self._seen.add(query)
+        if query in self._seen_mem:
+            return False
+        self._seen_mem.add(query)
+        return True
+
+    def add(self, query: str, priority: float = 0.0) -> bool:
+        """Schedule ``query`` unless it was already seen. Returns True if added."""
+        if not query or not self._first_time(query):
+            return False
+        self._push(query, priority)
+        return True
+
+    def feed(self, source: Iterable[tuple[str, float]], batch: int = 1000) -> None:
+        """Pull ``(query, priority)`` pairs from ``source`` whenever fewer than
+        ``batch`` queries are pending."""
+        self._source = iter(source)
+        self._batch = max(1, batch)
+
+    def _refill(self) -> None:
+        if self._source is None or len(self._heap) >= self._batch:
+            return
+        for _ in range(self._batch):
+            try:
+                query, priority = next(self._source)
+            except StopIteration:
+                self._source = None
+                return
+            self.add(query, priority)
+
+    async def get(self) -> Optional[str]:
+        """Next pending query, or None once the queue is drained or closed.
+
+        While other workers still hold queries in flight the call waits, since
+        those may come back via :meth:`requeue`.
+        """
+        while True:
+            if self._closed:
+                return None
+            self._refill()
+            if self._heap:
+                priority, _, query = heapq.heappop(self._heap)
+                self._in_flight[query] = priority
+                return query
+            if self._source is not None:
+                # a long run of duplicates in the source: let other tasks run
+                await asyncio.sleep(0)
+                continue
+            if not self._in_flight and not self._delayed:
+                return None
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def done(self, query: str) -> None:
+        self._in_flight.pop(query, None)
+        self._attempts.pop(query, None)
+        self.completed += 1
+        self._wakeup.set()
+
+    def requeue(self, query: str, failed: bool = False, delay: float = 0.0) -> bool:
+        """Give ``query`` back to the queue, after ``delay`` seconds if given.
+        Only a ``failed`` search uses up one of its attempts (a FloodWait or a
+        dead account is no fault of the query); returns False once they are
+        used up."""
+        if query not in self._in_flight:
+            return False
+        priority = self._in_flight.pop(query)
+        if not failed:
+            if delay > 0:
+                self._delayed[query] = priority
+                asyncio.get_running_loop().call_later(delay, self._undelay, query)
+            else:
+                self._push(query, priority)
+            return True
+        attempts = self._attempts.get(query, 0) + 1
+        self._attempts[query] = attempts
+        if attempts >= self.max_attempts:
+            logger.error("Query '%s' failed %d times, giving up", query, attempts)
+            del self._attempts[query]
+            self.failed += 1
+            self._wakeup.set()
+            return False
+        self._push(query, priority)
+        return True
+
+    def _undelay(self, query: str) -> None:
+        priority = self._delayed.pop(query, None)
+        if priority is not None:
+            self._push(query, priority)
+
+    def close(self) -> None:
+        """Stop handing out work, e.g. when the result budget is exhausted."""
+        self._closed = True
+        self._wakeup.set()
+
+    @property
+    def finished(self) -> bool:
+        """No more work will be handed out."""
+        return self._closed or (
+            not self._heap and not self._in_flight and not self._delayed and self._source is None
+        )
+
+    @property
+    def pending(self) -> int:
+        """Queries waiting in memory (not counting what a feed source has yet to yield)."""
+        return len(self._heap) + len(self._delayed)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
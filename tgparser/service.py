@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, AsyncIterator, Optional
+
+from . import metrics
+from .client import ClientFactory
+from .config import Config
+from .parser import Parser
+from .pipeline import ResultRecord
+from .sinks import ResultSink
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ("all", "channel", "chat")
+
+
+@dataclass
+class Job:
+    id: int
+    queries: list[str]
+    search_type: str
+    limit: int
+    events: asyncio.Queue = field(default_factory=asyncio.Queue)   # dicts, None at the end
+    cancelled: bool = False
+    results: int = 0
+
+    def emit(self, event: str, **payload: Any) -> None:
+        self.events.put_nowait({"event": event, "job": self.id, **payload})
+
+
+class JobSink(ResultSink):
+    """Streams a job's records to its submitter instead of the result files."""
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        self.target = f"job {job.id}"
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        for rec in records:
+            self.job.results += 1
+            self.job.emit("result", **asdict(rec))
+
+
+def parse_address(address: str) -> tuple[Optional[str], Optional[int], Optional[str]]:
+    """``host:port`` -> TCP, anything else is a Unix socket path: (host, port, path)."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port), None
+    return None, None, address
+
+
+def parse_job(line: bytes, default_limit: int) -> tuple[list[str], str, int]:
+    """Validate one request line: ``{"queries": [...], "search_type": "all", "limit": 50}``."""
+    req = json.loads(line)
+    if not isinstance(req, dict):
+        raise ValueError("request must be a JSON object")
+    queries = req.get("queries")
+    if isinstance(queries, str):
+        queries = [queries]
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        raise ValueError("'queries' must be a list of strings")
+    queries = [q.strip() for q in queries if q.strip()]
+    if not queries:
+        raise ValueError("no queries")
+    search_type = str(req.get("search_type", "all")).lower()
+    if search_type not in SEARCH_TYPES:
+        raise ValueError(f"'search_type' must be one of {', '.join(SEARCH_TYPES)}")
+    limit = int(req.get("limit", default_limit))
+    if limit <= 0:
+        raise ValueError("'limit' must be positive")
+    return queries, search_type, limit
+
+
+class SearchService:
+    """Daemon mode (``main.py --serve``): one :class:`Parser` whose clients
+    stay connected between jobs.
+
+    Proxies are probed and accounts preflighted once at start-up; jobs then
+    run one after another on the warm pool, so a job pays only for its own
+    searches. Jobs arrive as JSON lines over a Unix socket or TCP and their
+    results are streamed back as they are written.
+    """
+
+    def __init__(self, cfg: Config, client_factory: Optional[ClientFactory] = None) -> None:
+        self.cfg = cfg
+        self.parser = Parser(cfg, client_factory=client_factory)
+        self._jobs: asyncio.Queue[Job] = asyncio.Queue()
+        self._next_id = 1
+        self._running: Optional[tuple[Job, asyncio.Task]] = None
+
+    def _job_config(self, job: Job) -> Config:
+        # results go to the submitter as soon as they exist; nothing is
+        # deduplicated or journaled across jobs
+        return replace(
+            self.cfg,
+            search_type=job.search_type,
+            limit=job.limit,
+            results_flush_size=1,
+            seen_db=None,
+            journal_file=None,
+            metrics_port=None,
+            metrics_file=None,
+            trace_file=None,
+            proxy_probe=False,
+            preflight=False,
+        )
+
+    def submit(self, queries: list[str], search_type: str = "all", limit: Optional[int] = None) -> Job:
+        job = Job(self._next_id, queries, search_type, limit or self.cfg.limit)
+        self._next_id += 1
+        job.emit("accepted", queued=self._jobs.qsize() + (self._running is not None))
+        self._jobs.put_nowait(job)
+        return job
+
+    def cancel(self, job: Job) -> None:
+        job.cancelled = True
+        if self._running is not None and self._running[0] is job:
+            self._running[1].cancel()
+
+    async def _run_job(self, job: Job) -> None:
+        parser = self.parser
+        parser.cfg = self._job_config(job)
+        parser.result_sink = JobSink(job)
+        started = time.monotonic()
+        logger.info("Job %d: %d queries, %s, limit %d", job.id, len(job.queries), job.search_type, job.limit)
+        task = asyncio.create_task(parser.run_async(job.queries, keep_clients=True), name=f"job-{job.id}")
+        self._running = (job, task)
+        try:
+            await task
+            job.emit("done", results=job.results, elapsed=round(time.monotonic() - started, 3))
+        except asyncio.CancelledError:
+            if not job.cancelled:
+                raise
+            logger.info("Job %d cancelled", job.id)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Job %d failed: %s", job.id, exc)
+            job.emit("error", error=str(exc))
+        finally:
+            self._running = None
+            # workers cancelled mid-search never released their accounts
+            parser.acc_mgr.release_all()
+            job.events.put_nowait(None)
+
+    async def _runner(self) -> None:
+        while True:
+            job = await self._jobs.get()
+            if job.cancelled:
+                job.events.put_nowait(None)
+                continue
+            await self._run_job(job)
+
+    async def events(self, job: Job) -> AsyncIterator[dict]:
+        while True:
+            event = await job.events.get()
+            if event is None:
+                return
+            yield event
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        job: Optional[Job] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    queries, search_type, limit = parse_job(line, self.cfg.limit)
+                except (ValueError, TypeError) as exc:
+                    writer.write(json.dumps({"event": "error", "error": str(exc)}).encode() + b"\n")
+                    await writer.drain()
+                    continue
+                job = self.submit(queries, search_type, limit)
+                async for event in self.events(job):
+                    writer.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+                    await writer.drain()
+                job = None
+        except (ConnectionError, asyncio.IncompleteReadError) as exc:
+            logger.debug("Client went away: %s", exc)
+        finally:
+            if job is not None:
+                self.cancel(job)
+            writer.close()
+
+    async def serve(self, address: str) -> None:
+        host, port, path = parse_address(address)
+        metrics_server = None
+        if self.cfg.metrics_port:
+            try:
+                metrics_server = metrics.serve_http(self.cfg.metrics_port, self.cfg.metrics_host)
+            except OSError as exc:
+                logger.error("Metrics endpoint unavailable on port %d: %s", self.cfg.metrics_port, exc)
+
+        started = time.monotonic()
+        await self.parser.warm_up()
+        logger.info("Warm pool: %d clients connected in %.1fs", self.parser.connected, time.monotonic() - started)
+
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+        logger.info("Accepting jobs on %s", address)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        runner = asyncio.create_task(self._runner(), name="job-runner")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+            await self.parser.close_clients()
+            self.parser.sessions.checkpoint()
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+            if metrics_server is not None:
+                metrics_server.shutdown()
+                metrics_server.server_close()
+            logger.info("Service stopped")
+
+    def run(self, address: str) -> None:
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            pass
+
+
+async def submit(address: str, queries: list[str], search_type: str = "all",
+                 limit: Optional[int] = None) -> AsyncIterator[dict]:
+    """Send one job to a running service and yield its events."""
+    host, port, path = parse_address(address)
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        req: dict[str, Any] = {"queries": queries, "search_type": search_type}
+        if limit:
+            req["limit"] = limit
+        writer.write(json.dumps(req, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            event = json.loads(line)
+            yield event
+            if event["event"] in ("done", "error"):
+                return
+    finally:
+        writer.close()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import sqlite3
+from typing import Iterable, Optional, Union
+
+from telethon.crypto import AuthKey
+from telethon.sessions import MemorySession
+
+
+logger = logging.getLogger(__name__)
+
+# (dc_id, server_address, port, auth_key bytes)
+SessionState = tuple[Optional[int], Optional[str], Optional[int], bytes]
+
+
+def session_file(path: str) -> str:
+    return path if path.endswith(".session") else f"{path}.session"
+
+
+def _state(session: MemorySession) -> SessionState:
+    key = session.auth_key.key if session.auth_key else b""
+    return session.dc_id, session.server_address, session.port, key or b""
+
+
+def read_session(file: str) -> Optional[SessionState]:
+    con = sqlite3.connect(f"file:{file}?mode=ro", uri=True)
+    try:
+        row = con.execute("SELECT dc_id, server_address, port, auth_key FROM sessions").fetchone()
+    finally:
+        con.close()
+    if row is None:
+        return None
+    return row[0], row[1], row[2], bytes(row[3] or b"")
+
+
+def _write(file: str, state: SessionState) -> None:
+    """Replace the auth row of ``file`` atomically (copy, update, rename)."""
+    tmp = f"{file}.tmp"
+    shutil.copy2(file, tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute("DELETE FROM sessions")
+        con.execute(
+            "INSERT INTO sessions (dc_id, server_address, port, auth_key) VALUES (?, ?, ?, ?)",
+            state,
+        )
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, file)
+
+
+class SessionStore:
+    """``SESSION_MODE=memory``: run every client on a :class:`MemorySession`.
+
+    The auth key and DC of each ``.session`` file are loaded once; entity and
+    update-state writes that Telethon's SQLite session does on every response
+    never reach the disk. :meth:`checkpoint` writes back only sessions whose
+    auth key or DC changed, each with an atomic replace. With ``enabled``
+    False, :meth:`open` returns the path and Telethon uses the file directly.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._sessions: dict[str, tuple[MemorySession, str, SessionState]] = {}
+
+    def open(self, path: str) -> Union[str, MemorySession]:
+        if not self.enabled:
+            return path
+        cached = self._sessions.get(path)
+        if cached is not None:
+            return cached[0]
+        file = session_file(path)
+        if not os.path.exists(file):
+            logger.warning("No session file %s, using it on disk (login needed)", file)
+            return path
+        try:
+            state = read_session(file)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Cannot load session %s into memory, using it on disk: %s", file, exc)
+            return path
+
+        session = MemorySession()
+        if state is not None:
+            dc_id, address, port, key = state
+            session.set_dc(dc_id, address, port)
+            session.auth_key = AuthKey(data=key) if key else None
+        self._sessions[path] = (session, file, _state(session))
+        return session
+
+    def checkpoint(self, paths: Optional[Iterable[str]] = None) -> int:
+        """Persist auth changes of ``paths`` (default: all); returns sessions written."""
+        written = 0
+        for path in list(paths) if paths is not None else list(self._sessions):
+            entry = self._sessions.get(path)
+            if entry is None:
+                continue
+            session, file, saved = entry
+            state = _state(session)
+            # a dead account's files have been moved away: nothing to update
+            if state == saved or not os.path.exists(file):
+                continue
+            try:
+                _write(file, state)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to persist session %s: %s", file, exc)
+                continue
+            self._sessions[path] = (session, file, state)
+            written += 1
+        if written:
+            logger.info("Persisted %d changed session(s)", written)
+        return written
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from dataclasses import replace
+from typing import Any, Iterator, Optional
+
+from .client import ClientFactory
+from .config import Config
+from .dedup import SeenIndex
+from .journal import ProgressJournal
+from .logging_setup import setup_logging, stop_logging
+from .parser import Parser
+from .pipeline import ResultRecord
+from .queries import iter_queries
+from .sinks import ResultSink, make_sink
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 5.0
+
+
+class QueueSink(ResultSink):
+    """Shard-side sink: ships record batches to the collector process."""
+
+    def __init__(self, shard: int, out: Any) -> None:
+        self.shard = shard
+        self.out = out
+        self.target = f"collector (shard {shard})"
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        self.out.put(("records", self.shard, records))
+
+
+class SharedBudget:
+    """LIMIT shared by the shards of one run.
+
+    A shard claims a slot before it enriches a hit; the collector accepts the
+    records it writes and gives the slots of cross-shard duplicates back, so
+    no shard is held to a fixed quota. While claimed slots are still
+    undecided (:attr:`pending`) a shard that ran out waits for slots to come
+    back instead of finishing short.
+    """
+
+    def __init__(self, ctx: Any, limit: int, shards: int) -> None:
+        self.limit = limit
+        self.shard = -1    # set in each shard process
+        self._lock = ctx.Lock()
+        self._claimed = ctx.Array("i", shards, lock=False)
+        self._accepted = ctx.Array("i", shards, lock=False)
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return self.limit - sum(self._claimed)
+
+    @property
+    def pending(self) -> bool:
+        with self._lock:
+            return sum(self._claimed) > sum(self._accepted)
+
+    def take(self) -> bool:
+        with self._lock:
+            if sum(self._claimed) >= self.limit:
+                return False
+            self._claimed[self.shard] += 1
+            return True
+
+    def give_back(self, shard: Optional[int] = None) -> None:
+        with self._lock:
+            self._claimed[self.shard if shard is None else shard] -= 1
+
+    def accept(self, shard: int) -> None:
+        with self._lock:
+            self._accepted[shard] += 1
+
+    def release(self, shard: int) -> None:
+        """``shard`` exited: whatever it claimed and never delivered is free again."""
+        with self._lock:
+            self._claimed[shard] = self._accepted[shard]
+
+
+def _progress(parser: Parser) -> dict:
+    sched = parser.scheduler
+    return {
+        "done": sched.completed,
+        "left": sched.pending + sched.in_flight,
+        "sent": parser.sink.written if parser.sink is not None else 0,
+    }
+
+
+def _shard_queries(path: str, shard: int, shards: int) -> Iterator[str]:
+    """Every ``shards``-th base query of ``path``, streamed; each shard expands its own."""
+    for i, query in enumerate(iter_queries(path)):
+        if i % shards == shard:
+            yield query
+
+
+async def _run_shard(parser: Parser, shard: int, queries: Iterator[str], out: Any, resume: bool) -> None:
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            out.put(("progress", shard, _progress(parser)))
+
+    reporter = asyncio.create_task(report())
+    try:
+        await parser.run_async(queries, resume=resume)
+    finally:
+        reporter.cancel()
+        out.put(("progress", shard, _progress(parser)))
+
+
+def _shard_main(shard: int, shards: int, cfg: Config, accounts: list[str], out: Any, budget: SharedBudget,
+                resume: bool, client_factory: Optional[ClientFactory]) -> None:
+    setup_logging(cfg)
+    budget.shard = shard
+    try:
+        parser = Parser(cfg, client_factory=client_factory, accounts=accounts,
+                        result_sink=QueueSink(shard, out), budget=budget)
+        queries = _shard_queries(cfg.queries_file, shard, shards)
+        asyncio.run(_run_shard(parser, shard, queries, out, resume))
+    except KeyboardInterrupt:
+        pass
+    except Exception as exc:  # noqa: BLE001
+        logging.getLogger(__name__).exception("Shard %d crashed: %s", shard, exc)
+    finally:
+        out.put(("exit", shard, None))
+        # the process exits without atexit hooks: drain the log queue now
+        stop_logging()
+
+
+def run_sharded(cfg: Config, workers: int, resume: bool = False,
+                client_factory: Optional[ClientFactory] = None) -> None:
+    """Run one :class:`Parser` per process over disjoint shards of
+    ``cfg.queries_file`` and the accounts, and merge their results through a
+    single deduplicating collector."""
+    accounts: list[str] = []
+    if os.path.isdir(cfg.accounts_dir):
+        accounts = sorted(f for f in os.listdir(cfg.accounts_dir) if f.lower().endswith(".json"))
+    n = max(1, min(workers, len(accounts)))
+    logger.info("Sharding %s and %d accounts over %d workers", cfg.queries_file, len(accounts), n)
+
+    # the collector owns the persistent dedup index (shards only read it), the
+    # LIMIT budget and the journal of what was written; shard journals only
+    # track their queries
+    seen = SeenIndex(cfg.seen_db)
+    journal = ProgressJournal(cfg.journal_file, resume=resume)
+    written_base = journal.state.written
+    seen.remember(journal.state.written_ids)
+
+    ctx = mp.get_context()
+    out = ctx.Queue(maxsize=1000)
+    budget = SharedBudget(ctx, max(0, cfg.limit - written_base), n)
+    procs = []
+    for i in range(n):
+        cfg_i = replace(
+            cfg,
+            journal_file=f"{cfg.journal_file}.{i}" if cfg.journal_file else None,
+            metrics_port=cfg.metrics_port + i if cfg.metrics_port else None,
+            metrics_file=f"{cfg.metrics_file}.{i}" if cfg.metrics_file else None,
+            trace_file=f"{cfg.trace_file}.{i}" if cfg.trace_file else None,
+        )
+        proc = ctx.Process(
+            target=_shard_main,
+            args=(i, n, cfg_i, accounts[i::n], out, budget, resume, client_factory),
+            name=f"tgparser-shard-{i}",
+        )
+        proc.start()
+        procs.append(proc)
+
+    def on_flush(batch: list[ResultRecord]) -> None:
+        ids = [rec.peer_id for rec in batch if rec.peer_id is not None]
+        seen.persist(ids)
+        journal.mark_written(ids, written_base + sink.written)
+
+    def on_drop(batch: list[ResultRecord]) -> None:
+        for rec in batch:
+            seen.release(rec.peer_id)
+
+    sink = make_sink(cfg, on_flush=on_flush, on_drop=on_drop)
+    progress: dict[int, dict] = {}
+    accepted = duplicates = dropped = 0
+    live = n
+    last_report = time.monotonic()
+    try:
+        while live:
+            try:
+                kind, shard, payload = out.get(timeout=min(1.0, sink.time_to_flush() or 1.0))
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    break
+                kind, shard, payload = "idle", -1, None
+
+            if kind == "records":
+                for rec in payload:
+                    if accepted >= budget.limit:
+                        dropped += 1
+                    elif seen.add(rec.peer_id):
+                        sink.add(rec)
+                        budget.accept(shard)
+                        accepted += 1
+                    else:
+                        budget.give_back(shard)
+                        duplicates += 1
+            elif kind == "progress":
+                progress[shard] = payload
+            elif kind == "exit":
+                budget.release(shard)
+                live -= 1
+
+            if sink.time_to_flush() == 0.0:
+                sink.flush()
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                for i in sorted(progress):
+                    p = progress[i]
+                    logger.info("Shard %d: %d queries done, %d left, %d results sent", i, p["done"], p["left"], p["sent"])
+                logger.info("Collector: %d results written, %d cross-shard duplicates", accepted, duplicates)
+    finally:
+        sink.close()
+        journal.close()
+        seen.close()
+        for proc in procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+
+    logger.info(
+        "Finished. %d results saved to %s (%d duplicates merged, %d over LIMIT).",
+        sink.written, sink.target, duplicates, dropped,
+    )
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from telethon import errors, functions, types
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+from telethon.tl.functions.channels import GetFullChannelRequest, GetParticipantsRequest
+from telethon.tl.functions.messages import GetFullChatRequest
+
+from .client import ClientFactory
+
+
+def _stable_int(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=6).digest(), "big")
+
+
+@dataclass(frozen=True)
+class SimProfile:
+    """Behaviour of the simulated backend."""
+
+    latency: float = 0.05            # mean RPC latency, seconds
+    latency_dist: str = "fixed"      # fixed | uniform | exponential | lognormal
+    latency_sigma: float = 0.5       # spread for lognormal
+    flood_rate: float = 0.0          # share of RPCs answered with FloodWait
+    flood_seconds: int = 5
+    error_rate: float = 0.0          # share of RPCs failing with a connection error
+    search_rpc_error_rate: float = 0.0  # share of searches refused with an RPCError (dialog fallback)
+    dialogs: int = 0                 # size of every account's dialog list
+    overlap: float = 0.0             # share of search results drawn from a shared pool
+    shared_pool: int = 200
+    results_per_query: int = 20
+    seed: int = 0
+
+    def sample_latency(self, rnd: random.Random) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_dist == "uniform":
+            return rnd.uniform(0.0, 2 * self.latency)
+        if self.latency_dist == "exponential":
+            return rnd.expovariate(1.0 / self.latency)
+        if self.latency_dist == "lognormal":
+            # mean of the distribution stays at ``latency``
+            return rnd.lognormvariate(0.0, self.latency_sigma) * self.latency / math.exp(self.latency_sigma ** 2 / 2)
+        return self.latency
+
+
+@dataclass
+class SimStats:
+    """Counters shared by all fake clients of one run."""
+
+    calls: Counter = field(default_factory=Counter)       # by request type
+    latencies: list = field(default_factory=list)        # observed seconds per RPC
+    floods: int = 0
+    errors: int = 0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class FakeTelegramClient:
+    """Offline stand-in for ``TelegramClient``.
+
+    Serves SearchRequest / GetParticipantsRequest / GetFullChannelRequest /
+    GetFullChatRequest from a deterministic fake corpus. Latency, FloodWait and
+    error injection and the overlap between queries follow ``profile``; calls
+    are recorded in ``stats`` when given.
+    """
+
+    def __init__(self, session: str, api_id: int, api_hash: str, proxy: Any = None, *,
+                 latency: float = 0.05, results_per_query: int = 20,
+                 profile: Optional[SimProfile] = None, stats: Optional[SimStats] = None) -> None:
+        self.session = session
+        self.proxy = proxy
+        self.profile = profile or SimProfile(latency=latency, results_per_query=results_per_query)
+        self.stats = stats
+        self.calls = 0
+        self._connected = False
+        self._rnd = random.Random(self.profile.seed ^ _stable_int(str(session)))
+
+    async def _rpc_delay(self, request: Any = None, name: str = "connect") -> None:
+        """Simulated round trip; failures are only injected into ``request`` RPCs."""
+        self.calls += 1
+        started = time.monotonic()
+        delay = self.profile.sample_latency(self._rnd)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.stats is not None:
+            self.stats.calls[type(request).__name__ if request is not None else name] += 1
+            self.stats.latencies.append(time.monotonic() - started)
+        if request is None:
+            return
+        roll = self._rnd.random()
+        if roll < self.profile.flood_rate:
+            if self.stats is not None:
+                self.stats.floods += 1
+            raise errors.FloodWaitError(request=request, capture=self.profile.flood_seconds)
+        if roll < self.profile.flood_rate + self.profile.error_rate:
+            if self.stats is not None:
+                self.stats.errors += 1
+            raise ConnectionError("simulated connection error")
+
+    async def start(self) -> "FakeTelegramClient":
+        await self._rpc_delay()
+        self._connected = True
+        return self
+
+    async def connect(self) -> None:
+        await self._rpc_delay()
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    async def is_user_authorized(self) -> bool:
+        return self._connected
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def _entity(self, seed: str) -> types.Channel:
+        eid = _stable_int(seed)
+        rnd = random.Random(eid)
+        broadcast = rnd.random() < 0.5
+        return types.Channel(
+            id=eid,
+            title=f"Fake {seed}",
+            photo=types.ChatPhotoEmpty(),
+            date=None,
+            broadcast=broadcast,
+            megagroup=not broadcast,
+            access_hash=eid ^ 0x5A5A5A,
+            username=f"fake_{eid:x}",
+            participants_count=rnd.randint(10, 100_000),
+        )
+
+    def _search(self, query: str, limit: int) -> list[types.Channel]:
+        n = min(limit, self.profile.results_per_query)
+        rnd = random.Random(self.profile.seed ^ _stable_int(query))
+        seeds = []
+        for i in range(n):
+            if rnd.random() < self.profile.overlap:
+                seeds.append(f"shared#{rnd.randrange(self.profile.shared_pool)}")
+            else:
+                seeds.append(f"{query}#{i}")
+        return [self._entity(seed) for seed in seeds]
+
+    async def __call__(self, request: Any) -> Any:
+        await self._rpc_delay(request)
+        if isinstance(request, functions.contacts.SearchRequest):
+            if self._rnd.random() < self.profile.search_rpc_error_rate:
+                raise errors.RPCError(request, "SEARCH_QUERY_EMPTY", 400)
+            chats = self._search(request.q, request.limit)
+            return types.contacts.Found(my_results=[], results=[], chats=chats, users=[])
+        if isinstance(request, GetParticipantsRequest):
+            count = getattr(request.channel, "participants_count", None) or 0
+            return types.channels.ChannelParticipants(count=count, participants=[], chats=[], users=[])
+        if isinstance(request, GetFullChannelRequest):
+            count = getattr(request.channel, "participants_count", None) or 0
+            return SimpleNamespace(full_chat=SimpleNamespace(participants_count=count))
+        if isinstance(request, GetFullChatRequest):
+            return SimpleNamespace(full_chat=SimpleNamespace(participants=SimpleNamespace(count=0, participants=[])))
+        raise NotImplementedError(type(request).__name__)
+
+    async def get_dialogs(self, limit: Optional[int] = None) -> list:
+        await self._rpc_delay(name="GetDialogsRequest")
+        n = self.profile.dialogs if limit is None else min(limit, self.profile.dialogs)
+        dialogs = []
+        for i in range(n):
+            entity = self._entity(f"dialog#{i}")
+            dialogs.append(SimpleNamespace(name=entity.title, entity=entity))
+        return dialogs
+
+
+def fake_client_factory(**kwargs: Any) -> ClientFactory:
+    """Return a ``client_factory`` for :class:`TelethonWrapper` / :class:`Parser`."""
+    return functools.partial(FakeTelegramClient, **kwargs)
+
+
+def make_session_file(path: str, seed: str = "") -> None:
+    """Write a Telethon ``.session`` with a dummy auth key, enough to pass the preflight checks."""
+    session = SQLiteSession(path)
+    try:
+        session.set_dc(2, "149.154.167.51", 443)
+        session.auth_key = AuthKey(data=hashlib.sha512((seed or path).encode("utf-8")).digest() * 4)
+        session.save()
+    finally:
+        session.close()
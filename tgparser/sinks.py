@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import IO, Callable, Optional
+
+from . import tracing
+from .config import Config
+from .pipeline import ResultRecord
+
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("id", "type", "title", "count", "link", "query")
+
+
+def _row(rec: ResultRecord) -> dict:
+    return {
+        "id": rec.peer_id,
+        "type": rec.kind,
+        "title": rec.title,
+        "count": rec.count,
+        "link": rec.link,
+        "query": rec.query,
+    }
+
+
+def _open_append(path: str) -> IO[str]:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return open(path, "a", encoding="utf-8", newline="")
+
+
+class ResultSink:
+    """Writes batches of records. Files stay open for the whole run."""
+
+    target: str = ""
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class TextSink(ResultSink):
+    """Legacy ``title | count | link`` lines split into channels/chats files."""
+
+    def __init__(self, channels_path: str, chats_path: str) -> None:
+        self.target = f"'{channels_path}' and '{chats_path}'"
+        self._files = {"channel": _open_append(channels_path), "chat": _open_append(chats_path)}
+
+    @staticmethod
+    def _clean(title: str) -> str:
+        # '|' is the field separator and a newline would split the record
+        return " ".join(title.replace("|", "¦").split())
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        for rec in records:
+            self._files[rec.kind].write(f"{self._clean(rec.title)} | {rec.count} | {rec.link}\n")
+        for f in self._files.values():
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+class JsonlSink(ResultSink):
+    def __init__(self, path: str) -> None:
+        self.target = f"'{path}'"
+        self._file = _open_append(path)
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        self._file.write("".join(json.dumps(_row(r), ensure_ascii=False) + "\n" for r in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CsvSink(ResultSink):
+    def __init__(self, path: str) -> None:
+        self.target = f"'{path}'"
+        self._file = _open_append(path)
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        self._writer.writerows(_row(r) for r in records)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SqliteSink(ResultSink):
+    def __init__(self, path: str) -> None:
+        self.target = f"'{path}'"
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER, type TEXT, title TEXT, count INTEGER, link TEXT, query TEXT, found_at REAL)"
+        )
+        self._db.commit()
+
+    def write_batch(self, records: list[ResultRecord]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "INSERT INTO results (id, type, title, count, link, query, found_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(r.peer_id, r.kind, r.title, r.count, r.link, r.query, now) for r in records],
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class BufferedSink:
+    """Single-writer buffer in front of a :class:`ResultSink`.
+
+    Records are written once ``flush_size`` of them are buffered or the oldest
+    one is ``flush_interval`` seconds old, whichever comes first. ``on_flush``
+    gets every written batch, ``on_drop`` every batch that failed to write.
+    """
+
+    def __init__(self, sink: ResultSink, flush_size: int = 100, flush_interval: float = 2.0,
+                 on_flush: Optional[Callable[[list[ResultRecord]], None]] = None,
+                 on_drop: Optional[Callable[[list[ResultRecord]], None]] = None) -> None:
+        self.sink = sink
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.on_flush = on_flush
+        self.on_drop = on_drop
+        self.written = 0
+        self._buf: list[ResultRecord] = []
+        self._first_at = 0.0
+
+    @property
+    def target(self) -> str:
+        return self.sink.target
+
+    def add(self, rec: ResultRecord) -> None:
+        if not self._buf:
+            self._first_at = time.monotonic()
+        self._buf.append(rec)
+        if len(self._buf) >= self.flush_size:
+            self.flush()
+
+    def time_to_flush(self) -> Optional[float]:
+        """Seconds until the buffer is due, None when it is empty."""
+        if not self._buf:
+            return None
+        return max(0.0, self._first_at + self.flush_interval - time.monotonic())
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        batch, self._buf = self._buf, []
+        try:
+            with tracing.span("sink.write", cat="io", records=len(batch)):
+                self.sink.write_batch(batch)
+            self.written += len(batch)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to write %d results to %s: %s", len(batch), self.target, exc)
+            if self.on_drop is not None:
+                self.on_drop(batch)
+            return
+        if self.on_flush is not None:
+            self.on_flush(batch)
+
+    def close(self) -> None:
+        self.flush()
+        try:
+            self.sink.close()
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to close %s: %s", self.target, exc)
+
+
+def _file_sink(cfg: Config) -> ResultSink:
+    fmt = cfg.results_format
+    if fmt == "jsonl":
+        return JsonlSink(cfg.results_file or "results.jsonl")
+    if fmt == "csv":
+        return CsvSink(cfg.results_file or "results.csv")
+    if fmt == "sqlite":
+        return SqliteSink(cfg.results_file or "results.sqlite3")
+    return TextSink(cfg.results_channels, cfg.results_chats)
+
+
+def make_sink(cfg: Config, on_flush: Optional[Callable[[list[ResultRecord]], None]] = None,
+              sink: Optional[ResultSink] = None,
+              on_drop: Optional[Callable[[list[ResultRecord]], None]] = None) -> BufferedSink:
+    """Buffered writer over ``sink``, or over the file sink selected by RESULTS_FORMAT."""
+    return BufferedSink(
+        sink or _file_sink(cfg),
+        flush_size=cfg.results_flush_size,
+        flush_interval=cfg.results_flush_interval,
+        on_flush=on_flush,
+        on_drop=on_drop,
+    )
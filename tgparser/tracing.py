@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "tid", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.tid = self.tracer.current_tid()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.cat, self.tid, self.start, time.perf_counter(), self.args)
+
+
+class Tracer:
+    """Collects complete ("X") events in Chrome trace format.
+
+    Every asyncio task (or thread, outside the event loop) gets its own track,
+    so concurrent spans of different workers do not overlap in the viewer.
+    """
+
+    def __init__(self, max_events: int = 1_000_000) -> None:
+        self.max_events = max_events
+        self.events: list[dict] = []
+        self.dropped = 0
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._tids: dict[int, int] = {}
+
+    def current_tid(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        tid = self._tids.get(key)
+        if tid is None:
+            tid = self._tids[key] = len(self._tids) + 1
+            label = task.get_name() if task is not None else threading.current_thread().name
+            self.events.append({"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid, "args": {"name": label}})
+        return tid
+
+    def complete(self, name: str, cat: str, tid: int, start: float, end: float, args: dict) -> None:
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {
+            "ph": "X",
+            "name": name,
+            "cat": cat,
+            "pid": self.pid,
+            "tid": tid,
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def export(self, path: str) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        logger.info("Trace with %d events written to %s (%d dropped)", len(self.events), path, self.dropped)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(max_events: int = 1_000_000) -> Tracer:
+    global _tracer
+    _tracer = Tracer(max_events)
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, cat: str = "parser", **args: Any):
+    """Context manager timing one stage; a shared no-op while tracing is off."""
+    if _tracer is None:
+        return _NOOP
+    return _Span(_tracer, name, cat, args)
+
+
+def export(path: str) -> None:
+    """Write the collected trace to ``path`` (open in chrome://tracing or Perfetto)."""
+    if _tracer is None:
+        return
+    try:
+        _tracer.export(path)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to write trace %s: %s", path, exc)